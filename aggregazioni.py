@@ -0,0 +1,199 @@
+import polars as pl
+
+import correlazioni as corr
+from cubo import fetta
+from data import AGGREGATI, CODICE, iso2_to_iso3
+
+# aggregazioni usate dai grafici della dashboard, senza dipendenze da streamlit:
+# le pagine della dashboard le chiamano attraverso query.py (con cache), bench.py le misura
+
+def paesi_iso3(df):
+    # codice iso3 di ogni paese, senza i codici aggregati: la conversione si fa solo sui paesi distinti.
+    # il paese resta come testo: il cubo viene da un'altra lettura, con codifiche dei Categorical diverse
+    return (
+        df
+        .select(pl.col("country").cast(pl.String))
+        .unique()
+        .filter(~pl.col("country").is_in(AGGREGATI)) # ~ negazione da T a F e vicev.
+        .with_columns(
+            # da iso2 a iso3 con la tabella di conversione, codici sconosciuti -> null
+            pl.col("country").replace_strict(iso2_to_iso3(), default = None).alias("country_iso3")
+        )
+        .drop_nulls("country_iso3")
+    )
+
+def _anni(year):
+    # year None: tutti gli anni insieme, con la colonna "year" nel risultato (mappe animate, un frame per anno,
+    # e grafici con l'anno scelto nel browser)
+    return ({}, ["year"]) if year is None else ({"year": year}, [])
+
+def bar_chart(cubo, year = None):
+    filtri, anno = _anni(year)
+    return (
+        fetta(cubo, per = ["country"] + anno, age = 1, **filtri)# media asp. di vita per paese nell'anno selezionato
+        .filter(~pl.col("country").is_in(AGGREGATI))
+        .select(*anno, "country", pl.col("life_exp").round(1).alias("average"))
+    )
+
+def sex(cubo, year, countries):
+    filtri, anno = _anni(year)
+    return (
+        # media asp. di vita per sesso e paese, solo maschio e femmina, per anno e paesi scelti
+        fetta(cubo, per = anno, country = [c for c in countries if c not in AGGREGATI], sex = ["M", "F"], age = 1, **filtri)
+        .select(*anno, "country", "sex", pl.col("life_exp").alias("average_life_exp"))
+    )
+
+def mappa(cubo, paesi_iso3, year = None):
+    filtri, anno = _anni(year)
+    return (
+        fetta(cubo, per = ["country"] + anno, age = 1, **filtri) # somme e conteggi per paese nell'anno selezionato
+        .with_columns(pl.col("country").cast(pl.String))
+        .join(paesi_iso3, on = "country") # codice iso3 di ogni paese
+            .group_by(["country_iso3"] + anno)
+            .agg(
+                (pl.col("somma").sum() / pl.col("n").sum()).round(2).alias("asp. di vita media")# media asp. di vita per paese
+                                                                              #(codice isp3 invece di iso2 in questo caso)
+            )
+    )
+
+def gap_mappa(cubo, paesi_iso3, year = None):
+    filtri, anno = _anni(year)
+    df1 = (
+        # teniamo solo sesso maschio e femmina (no T - totale) per l'anno selezionato
+        fetta(cubo, per = ["country"] + anno, sex = ["M", "F"], age = 1, **filtri)
+        .with_columns(pl.col("country").cast(pl.String))
+        .join(paesi_iso3, on = "country")
+        .group_by(["country_iso3", "sex"] + anno)
+        .agg(
+            (pl.col("somma").sum() / pl.col("n").sum()).alias("average_life_exp")# media asp. di vita per paese e sesso
+        )
+    )
+
+    # pivot per avere una colonna per ogni sesso
+    pivoted_means = (
+        df1
+        .pivot(
+            values = "average_life_exp",
+            index = ["country_iso3"] + anno,
+            on = "sex"
+        )
+        .rename({"M": "male_avg", "F": "female_avg"})
+        .select(["country_iso3"] + anno + ["male_avg", "female_avg"]) # ordine fisso, il pivot segue quello delle righe
+    )
+
+    return ( # differenza tra femmine e maschi
+        pivoted_means
+        .with_columns(
+            (pl.col("female_avg") - pl.col("male_avg")).alias("Deviazione")
+        )
+    )
+
+def trend_globale(cubo):
+    return (
+        fetta(cubo, per = ["year"], sex = "T", age = 1)  # consideriamo tutti i sessi, media asp. di vita per anno
+        .select("year", pl.col("life_exp").round(2).alias("global_average"))
+    )
+
+def trend(cubo, countries):
+    return (
+        # media asp. di vita per anno, paese e sesso, per i paesi scelti
+        # non consideriamo il totale dato che vogliamo distinguere maschi da femmine
+        fetta(cubo, per = ["year"], country = countries, sex = ["M", "F"], age = 1)
+        .select("year", "country", "sex", "life_exp")
+    )
+
+def anomalie(cubo, year = None):
+    filtri, anno = _anni(year)
+    data = (
+        fetta(cubo, per = ["country"] + anno, age = 1, **filtri)  # media asp. di vita di ogni paese rispetto all'anno scelto
+        .filter(~pl.col("country").is_in(AGGREGATI))
+        .select(*anno, "country", pl.col("life_exp").alias("average_life_exp"))
+        .sort(anno + ["country"]) # ordine fisso delle righe: la media globale (somma in virgola mobile) è sempre la stessa
+    )
+
+    # media globale rispetto all'anno scelto (con tutti gli anni, una per anno)
+    global_mean = pl.col("average_life_exp").mean()
+    if anno:
+        global_mean = global_mean.over(anno)
+
+    # deviazione dalla media globale
+    deviation = data.with_columns(
+        (pl.col("average_life_exp") - global_mean).round(2).alias("deviation_from_mean")
+    )
+
+    # a parità di deviazione si ordina per paese, così i 10 paesi scelti non dipendono dall'ordine delle righe
+    def primi(descending): # i 5 paesi con la deviazione più alta (o più bassa) di ogni anno
+        ordinati = deviation.sort(anno + ["deviation_from_mean", "country"],
+                                  descending = [False] * len(anno) + [descending, False])
+        return ordinati.group_by(anno, maintain_order = True).head(5).select(deviation.columns) if anno else ordinati.head(5)
+
+    top_5_positive = primi(True)
+    top_5_negative = primi(False)
+
+    return top_5_positive.vstack(top_5_negative)
+
+def percentili(df_tot):
+    # percentili dell'aspettativa di vita per la heatmap, per tutti i paesi in una sola passata (finestra per paese).
+    # si ordina sul limite superiore di ogni intervallo (numero) e non sull'etichetta di qcut (Categorical: le
+    # codifiche seguono l'ordine di comparsa e non quello dei valori)
+    return (
+        df_tot
+        .lazy()
+        .filter(pl.col("sex") != "T")# consideriamo solo maschi e femmine
+        .filter(pl.col("year") != 2023)# pochi datinel 2023, errori di visualizzazione, quindi tolti
+        .with_columns(
+            pl.col("life_exp")
+            .qcut(100, include_breaks = True) # percentili, per una visualizzazione migliore
+            .struct.field("breakpoint")
+            .rank(method = "dense")
+            .over("country")
+            .cast(pl.UInt8)
+            .alias("Percentile")
+        )
+        .sort("country") # righe di ogni paese contigue: la heatmap di un paese è una slice
+        .collect()
+    )
+
+def heatmap(df_paese):
+    # df_paese: righe (tutte le età) del paese scelto, anche lazy, es. scan_life con filtro sul paese
+    return percentili(df_paese)
+
+def join(cubo, df_work):
+    # aggrego la media dell'aspettativa di vita per paese e anno, con dataset con solo eta <= 1.
+    # cubo e df_work vengono da letture diverse (codifiche dei Categorical diverse): il join si fa sul paese come
+    # testo, che poi torna un codice
+    df_mean = (fetta(cubo, per = ["country", "year"], age = 1)
+               .select(pl.col("country").cast(pl.String), "year", pl.col("life_exp").round(2).alias("life_exp_mean"))
+               )
+    # stessa cosa per il dataset del tasso dei lavoratori a rischio di povertà
+    work_mean = (df_work
+               .group_by(pl.col("country").cast(pl.String), "year")
+               .agg(
+                   pl.col("poverty_rate").cast(pl.Float64).round(4).mean().round(2).alias("poverty_rate_mean") # Float32 -> valore del file
+                   )
+               )
+
+    # join in paese ed anno per avere un'unico dataframe
+    return df_mean.join(
+        work_mean,
+        on = ["country", "year"],
+        how = "inner"
+    ).with_columns(pl.col("country").cast(CODICE))
+
+def correlazione(df_join, country, tutte = None):
+    # daatframe join filtrato per il paese scelto per il grafico (query.py passa già le sole righe del paese).
+    # il valore è quello di correlazioni.tutte (null con meno di ANNI_MIN anni in comune): tutte = tabella già
+    # calcolata per tutti i paesi (query.py), altrimenti si calcola sulle sole righe del paese
+    df_filtered_join = df_join.filter(pl.col("country") == country)
+    # dataframe join con unpivot colonne, solo per il paese scelto
+    df_filtered = (
+        df_filtered_join.unpivot(
+            index=["country", "year"], # rimangono invariate
+            on=["life_exp_mean", "poverty_rate_mean"], # valori nuova colonna
+            variable_name="metric",# nome nuova colonna
+            value_name="value" # nome colonna con valori delle 2 var unite
+        )
+    )
+    # correlazione
+    correlation = (corr.tutte(df_filtered_join) if tutte is None else tutte).filter(pl.col("country") == country)
+    return df_filtered, df_filtered_join, correlation["correlazione"].item(0) if correlation.height else None
@@ -0,0 +1,157 @@
+import argparse
+import gzip
+import json
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import polars as pl
+
+import aggregazioni as agg
+import correlazioni as corr
+import data
+from cubo import costruisci
+
+# benchmark dei loader, delle fasi del preprocessing e delle aggregazioni di ogni grafico.
+# uso: python bench.py --scale 1 10 100         (misura e salva i risultati)
+#      python bench.py --confronta <commit>     (confronta l'ultima misura con quella di un altro commit)
+
+LIFE = "estat_demo_mlexpec.tsv.gz"
+WORK = "estat_ilc_iw01.tsv.gz"
+CARTELLA = Path(__file__).parent / ".bench"
+RISULTATI = CARTELLA / "risultati.jsonl" # una riga json per misura, si accumulano tra i commit
+
+def sintetico(url, scala):
+    # dataset sintetico "scala" volte più grande: le righe vengono replicate cambiando il codice del paese
+    # (ultima variabile della colonna aggregata, es. "A,YR,F,Y1,IT" -> "A,YR,F,Y1,IT_3")
+    if scala == 1:
+        return url
+    path = CARTELLA / "dati" / f"{Path(url).name.split('.')[0]}-x{scala}.tsv.gz"
+    if not path.exists():
+        raw = pl.read_csv(url, separator = "\t", infer_schema = False)
+        chiave = raw.columns[0]
+        copie = [raw] + [raw.with_columns(pl.col(chiave) + f"_{i}") for i in range(1, scala)]
+        path.parent.mkdir(parents = True, exist_ok = True)
+        with gzip.open(path, "wb") as f:
+            f.write(pl.concat(copie).write_csv(separator = "\t").encode())
+    return str(path)
+
+def misura(fn, ripetizioni):
+    fn() # riscaldamento (cache del sistema operativo, indici del cubo creati alla prima richiesta, ...)
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        fn()
+        tempi.append((time.perf_counter() - inizio) * 1000)
+    return min(tempi), statistics.median(tempi)
+
+def casi(scala):
+    # ogni caso: nome -> funzione da misurare. Gli input di ogni fase sono preparati prima,
+    # così si misura solo la fase stessa
+    life, work = sintetico(LIFE, scala), sintetico(WORK, scala)
+    raw_life, raw_work = data._leggi(life), data._leggi(work)
+    pl_, pw = data.PARSE_LIFE, data.PARSE_WORK
+    diviso_life = data._dividi(raw_life, pl_["campi"], pl_["chiavi"])
+    diviso_work = data._dividi(raw_work, pw["campi"], pw["chiavi"])
+    lungo_life = data._unpivot(raw_life, pl_["valore"], pl_["anno"])
+    lungo_work = data._unpivot(raw_work, pw["valore"], pw["anno"])
+
+    df_tot = data.life(life)
+    df = df_tot.filter(pl.col("age") == 1)
+    df_work = data.work(work).select("country", "year", "poverty_rate")
+    c = costruisci(df_tot)
+    paesi = agg.paesi_iso3(df)
+    df_join = agg.join(c, df_work)
+    df_paese = df_tot.filter(pl.col("country") == "IT")
+
+    return {
+        "loader/life": lambda: data.life(life, cache = False),
+        "loader/work": lambda: data.work(work, cache = False),
+        "loader/life_cache": lambda: data.life(life),
+        "loader/work_cache": lambda: data.work(work),
+        "parse/life/lettura": lambda: data._leggi(life),
+        "parse/life/split": lambda: data._dividi(raw_life, pl_["campi"], pl_["chiavi"]),
+        "parse/life/unpivot": lambda: data._unpivot(raw_life, pl_["valore"], pl_["anno"]),
+        "parse/life/regex": lambda: data._pulisci(lungo_life, diviso_life, pl_["valore"], pl_["misura"], pl_["ordine"]),
+        "parse/work/lettura": lambda: data._leggi(work),
+        "parse/work/split": lambda: data._dividi(raw_work, pw["campi"], pw["chiavi"]),
+        "parse/work/unpivot": lambda: data._unpivot(raw_work, pw["valore"], pw["anno"]),
+        "parse/work/regex": lambda: data._pulisci(lungo_work, diviso_work, pw["valore"], pw["misura"], pw["ordine"]),
+        "agg/cubo": lambda: costruisci(df_tot),
+        "agg/barre": lambda: agg.bar_chart(c, 2003),
+        "agg/sessi": lambda: agg.sex(c, 2003, ["IT", "BE", "CH"]),
+        "agg/mappa": lambda: agg.mappa(c, paesi, 2003),
+        "agg/gap_mappa": lambda: agg.gap_mappa(c, paesi, 2003),
+        "agg/mappa_anni": lambda: agg.mappa(c, paesi),
+        "agg/gap_mappa_anni": lambda: agg.gap_mappa(c, paesi),
+        "agg/trend_globale": lambda: agg.trend_globale(c),
+        "agg/trend": lambda: agg.trend(c, ["IT", "BE", "CH"]),
+        "agg/anomalie": lambda: agg.anomalie(c, 2003),
+        "agg/heatmap": lambda: agg.heatmap(df_paese),
+        "agg/percentili": lambda: agg.percentili(df_tot),
+        "agg/join": lambda: agg.join(c, df_work),
+        "agg/correlazione": lambda: agg.correlazione(df_join, "IT"),
+        "corr/tutte": lambda: corr.tutte(df_join),
+        "corr/mobili": lambda: corr.mobili(df_join),
+        "corr/ritardate": lambda: corr.ritardate(df_join),
+        "corr/bootstrap": lambda: corr.bootstrap(df_join),
+    }
+
+def commit_corrente():
+    sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True).stdout.strip()
+    sporco = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                 capture_output = True, text = True).stdout.strip())
+    return sha + ("-dirty" if sporco else "")
+
+def esegui(scale, ripetizioni, filtro, salva):
+    # la cache dei dataset puliti dei benchmark è separata da quella della dashboard
+    data.CACHE_DIR = CARTELLA / "cache"
+    commit = commit_corrente()
+    quando = datetime.now(timezone.utc).isoformat(timespec = "seconds")
+    righe = []
+    for scala in scale:
+        for nome, fn in casi(scala).items():
+            if filtro and filtro not in nome:
+                continue
+            minimo, mediana = misura(fn, ripetizioni)
+            print(f"x{scala:<4} {nome:<24} min {minimo:10.2f} ms   mediana {mediana:10.2f} ms")
+            righe.append({"commit": commit, "data": quando, "scala": scala, "nome": nome,
+                          "min_ms": round(minimo, 3), "mediana_ms": round(mediana, 3), "ripetizioni": ripetizioni})
+    if salva:
+        CARTELLA.mkdir(exist_ok = True)
+        with open(RISULTATI, "a") as f:
+            for riga in righe:
+                f.write(json.dumps(riga) + "\n")
+
+def confronta(riferimento, soglia):
+    # per ogni commit si tiene la misura più recente di ogni (nome, scala)
+    ris = pl.read_ndjson(RISULTATI).sort("data").group_by("commit", "nome", "scala").last()
+    attuale = ris.filter(pl.col("commit") == commit_corrente())
+    if attuale.is_empty(): # commit corrente non misurato: si usa l'ultimo misurato
+        attuale = ris.filter(pl.col("data") == ris["data"].max())
+    rif = ris.filter(pl.col("commit").str.starts_with(riferimento))
+    tabella = (
+        rif.select("nome", "scala", pl.col("mediana_ms").alias("prima"))
+        .join(attuale.select("nome", "scala", pl.col("mediana_ms").alias("dopo")), on = ["nome", "scala"])
+        .with_columns((pl.col("dopo") / pl.col("prima")).round(2).alias("rapporto"))
+        .sort("scala", "nome")
+    )
+    for nome, scala, prima, dopo, rapporto in tabella.iter_rows():
+        segno = "  REGRESSIONE" if rapporto > 1 + soglia else ""
+        print(f"x{scala:<4} {nome:<24} {prima:10.2f} -> {dopo:10.2f} ms  x{rapporto:<6}{segno}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark dei loader e delle aggregazioni della dashboard")
+    parser.add_argument("--scale", type = int, nargs = "+", default = [1, 10], help = "moltiplicatori del dataset sintetico")
+    parser.add_argument("--ripetizioni", type = int, default = 3)
+    parser.add_argument("--filtro", help = "misura solo i casi il cui nome contiene questo testo")
+    parser.add_argument("--no-salva", action = "store_true", help = "non aggiunge i risultati a .bench/risultati.jsonl")
+    parser.add_argument("--confronta", metavar = "COMMIT", help = "confronta con le misure di un commit precedente")
+    parser.add_argument("--soglia", type = float, default = 0.1, help = "rallentamento segnalato come regressione (0.1 = 10%%)")
+    args = parser.parse_args()
+    if args.confronta:
+        confronta(args.confronta, args.soglia)
+    else:
+        esegui(args.scale, args.ripetizioni, args.filtro, not args.no_salva)
@@ -0,0 +1,122 @@
+import polars as pl
+
+# correlazioni tra aspettativa di vita media e tasso di povertà dei lavoratori per tutti i paesi insieme:
+# ogni funzione fa un solo group_by su df_join (paese, anno, life_exp_mean, poverty_rate_mean)
+# invece di filtrare e ricalcolare paese per paese
+
+VITA = "life_exp_mean"
+POVERTA = "poverty_rate_mean"
+# anni in comune minimi per riportare una correlazione: con 2-4 anni r è ±1 o quasi anche tra serie indipendenti
+ANNI_MIN = 5
+
+def _corr(a = VITA, b = POVERTA):
+    # nan se una delle due serie è costante: meglio null, così non finisce nelle medie e nei quantili
+    return pl.corr(a, b, method = "pearson").fill_nan(None)
+
+def _corr_minima(): # correlazione del gruppo, null se ha meno di ANNI_MIN anni
+    return pl.when(pl.len() >= ANNI_MIN).then(_corr().round(2))
+
+def tutte(df_join):
+    # una riga per paese: correlazione e numero di anni in comune
+    return (
+        df_join
+        .group_by("country")
+        .agg(_corr_minima().alias("correlazione"), pl.len().alias("anni"))
+        .sort("country")
+    )
+
+def mobili(df_join, finestra = 5):
+    # correlazione sulle ultime "finestra" osservazioni di ogni paese, anno per anno
+    if finestra < ANNI_MIN: # stesso minimo di anni delle altre correlazioni, con meno r è ±1 o quasi
+        raise ValueError(f"la finestra deve essere di almeno {ANNI_MIN} anni, non {finestra}")
+    return (
+        df_join
+        .sort("country", "year")
+        .with_columns(
+            pl.rolling_corr(VITA, POVERTA, window_size = finestra)
+            .over("country")
+            .fill_nan(None)
+            .round(2)
+            .alias("correlazione")
+        )
+        .select("country", "year", "correlazione")
+    )
+
+def ritardate(df_join, ritardi = (0, 1, 2, 3)):
+    # povertà dell'anno t contro aspettativa di vita dell'anno t + k: si spostano gli anni della povertà e si
+    # riunisce per (paese, anno), per tutti i ritardi in un solo frame, poi un group_by su (paese, ritardo)
+    vita = df_join.select("country", "year", VITA)
+    poverta = df_join.select("country", "year", POVERTA)
+    spostate = pl.concat([
+        poverta.with_columns(pl.col("year") + k, pl.lit(k).alias("ritardo")) for k in ritardi
+    ])
+    return (
+        spostate
+        .join(vita, on = ["country", "year"])
+        .group_by("country", "ritardo")
+        .agg(_corr_minima().alias("correlazione"), pl.len().alias("anni")) # null con pochi anni: non può essere il ritardo scelto
+        .sort("country", "ritardo")
+    )
+
+def bootstrap(df_join, campioni = 1000, livello = 0.95, seme = 0, blocco = 100):
+    # intervallo di confidenza della correlazione di ogni paese: per ogni campione si estraggono con reinserimento
+    # tanti anni quanti ne ha il paese. L'estrazione è un hash (con seme) di (campione, posizione), quindi i risultati
+    # sono riproducibili. I campioni di tutti i paesi si calcolano insieme, "blocco" campioni alla volta: il picco di
+    # memoria resta piccolo (l'allocatore non restituisce al sistema quella usata da un frame unico di tutti i campioni)
+    righe = df_join.sort("country", "year").with_row_index("riga")
+    paesi = (
+        righe
+        .group_by("country")
+        .agg(pl.col("riga").min().alias("inizio"), pl.len().alias("n"))
+        .filter(pl.col("n") >= ANNI_MIN) # con pochi anni nessun intervallo (null nella tabella)
+    )
+
+    def correlazioni(da, a): # correlazione di ogni paese per i campioni da..a-1
+        estrazioni = (
+            paesi
+            .with_columns(pl.int_ranges(da, a).alias("campione"))
+            .explode("campione")
+            .with_columns(pl.int_ranges(0, pl.col("n")).alias("posizione"))
+            .explode("posizione")
+            .select(
+                "campione",
+                (pl.col("inizio") + pl.struct("campione", "posizione", "inizio").hash(seme) % pl.col("n"))
+                .cast(pl.UInt32)
+                .alias("riga")
+            )
+        )
+        return (
+            estrazioni
+            .join(righe, on = "riga")
+            .group_by("country", "campione")
+            .agg(_corr().alias("correlazione"))
+        )
+
+    coda = (1 - livello) / 2
+    return (
+        pl.concat([correlazioni(da, min(da + blocco, campioni)) for da in range(0, campioni, blocco)])
+        .group_by("country")
+        .agg(
+            pl.col("correlazione").quantile(coda).round(2).alias("ic_basso"),
+            pl.col("correlazione").quantile(1 - coda).round(2).alias("ic_alto"),
+        )
+        .sort("country")
+    )
+
+def tabella(df_join, campioni = 1000, livello = 0.95):
+    # correlazione di ogni paese con il suo intervallo di confidenza e il ritardo (in anni) con la correlazione più forte
+    ritardi = ritardate(df_join)
+    migliore = (
+        ritardi
+        .drop_nulls("correlazione")
+        .sort(pl.col("correlazione").abs(), descending = True)
+        .group_by("country", maintain_order = True)
+        .first()
+        .select("country", pl.col("ritardo").alias("ritardo_max"), pl.col("correlazione").alias("correlazione_ritardo_max"))
+    )
+    return (
+        tutte(df_join)
+        .join(bootstrap(df_join, campioni, livello), on = "country", how = "left")
+        .join(migliore, on = "country", how = "left")
+        .sort("country")
+    )
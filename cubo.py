@@ -0,0 +1,123 @@
+import threading
+from itertools import combinations, product, takewhile
+
+import polars as pl
+
+# dimensioni del cubo, nell'ordine usato per nominare i rollup
+DIMENSIONI = ("country", "year", "sex", "age")
+# ordine delle righe di ogni rollup: tutte le aggregazioni della dashboard filtrano l'età, poi quasi sempre sesso e/o
+# anno, il paese per ultimo. Le dimensioni filtrate che formano l'inizio di quest'ordine individuano righe contigue
+ORDINE = ("age", "sex", "year", "country")
+_BIT = {"age": 8, "sex": 8, "year": 16, "country": 32} # bit del codice di ogni dimensione, vedi _ordina
+# il cubo è condiviso tra le sessioni (thread) del processo: gli indici si creano uno alla volta
+_lock_indici = threading.Lock()
+
+def costruisci(df, misura = "life_exp", dimensioni = DIMENSIONI):
+    # livello base: somma e numero di osservazioni per ogni combinazione di tutte le dimensioni.
+    # si tengono somma e conteggio (e non la media) così i rollup danno la media esatta delle righe
+    # originali anche quando i gruppi hanno numerosità diverse (es. età "Y_LT1" e "Y1" diventano entrambe 1)
+    base = (
+        df.lazy() # accetta sia DataFrame che LazyFrame (es. scan_life), così la lettura è una sola aggregazione
+        .group_by(dimensioni)
+        .agg(
+            # la misura può essere Float32 (~7 cifre significative): in Float64 e arrotondata a 4 decimali
+            # torna il valore letto dal file, così somme e medie sono le stesse che con i dati in Float64
+            # le somme di valori con 4 decimali hanno 4 decimali: arrotondate tolgono l'errore dell'ordine di somma,
+            # che cambia da un'esecuzione all'altra e faceva oscillare le medie arrotondate (es. 69.6 / 69.7)
+            pl.col(misura).cast(pl.Float64).round(4).sum().round(4).alias("somma"),
+            pl.col(misura).count().alias("n")
+        )
+        .collect()
+    )
+    rollup = {tuple(dimensioni): base}
+    # un rollup per ogni sottoinsieme di dimensioni (2^4 = 16), dal livello base fino al totale generale.
+    # ognuno si calcola dal rollup "padre" più piccolo (una dimensione in più) invece che dal livello base
+    for k in range(len(dimensioni) - 1, -1, -1):
+        for dims in combinations(dimensioni, k):
+            padre = min((rollup[p] for p in combinations(dimensioni, k + 1) if set(dims) <= set(p)),
+                        key = lambda r: r.height)
+            if dims:
+                rollup[dims] = padre.group_by(dims).agg(pl.col("somma").sum().round(4), pl.col("n").sum())
+            else:
+                rollup[dims] = padre.select(pl.col("somma").sum().round(4), pl.col("n").sum())
+    rollup = {dims: _ordina(r.with_columns((pl.col("somma") / pl.col("n")).alias(misura)), dims)
+              for dims, r in rollup.items()}
+    return {"dimensioni": dimensioni, "rollup": rollup, "indici": {}}
+
+def _ordina(r, dims):
+    # per avere i gruppi contigui basta ordinare per codici (to_physical) e non alfabeticamente. I codici delle
+    # dimensioni vengono messi in un solo intero a 64 bit (age | sex | year | country): ordinare una colonna
+    # è ~4 volte più veloce che ordinarne quattro
+    chiave = None
+    for d in ORDINE:
+        if d in dims:
+            codice = pl.col(d).to_physical().cast(pl.UInt64)
+            chiave = codice if chiave is None else chiave * (1 << _BIT[d]) + codice
+    return r if chiave is None else r.sort(chiave)
+
+def posizioni(df, chiavi):
+    # df ordinato per chiavi: posizione (inizio, lunghezza) delle righe di ogni combinazione di valori, chiave = tupla.
+    # I gruppi sono righe contigue, quindi bastano i punti in cui cambia una delle chiavi, senza group_by
+    # (e senza le sue tabelle hash, che per frame grandi l'allocatore non restituisce)
+    inizi = df.select(
+        pl.any_horizontal([pl.col(c).ne_missing(pl.col(c).shift()) for c in chiavi]).arg_true().alias("inizio")
+    )["inizio"]
+    fini = inizi.slice(1).append(pl.Series([df.height], dtype = inizi.dtype))
+    return {k: (i, f - i) for k, i, f in zip(df.select(chiavi)[inizi].rows(), inizi, fini)}
+
+def _livelli(dimensioni): # sottoinsiemi delle dimensioni, nell'ordine in cui costruisci crea i rollup
+    return [dims for k in range(len(dimensioni), -1, -1) for dims in combinations(dimensioni, k)]
+
+def impila(cubo):
+    # tutti i rollup uno sotto l'altro in un solo frame (dimensioni assenti = null, "livello" = numero del rollup),
+    # così il cubo si salva in cache come una tabella qualsiasi. I codici sono uniti come testo (in cache vanno
+    # comunque come testo): le colonne null delle dimensioni assenti avrebbero codifiche dei Categorical diverse
+    livelli = _livelli(cubo["dimensioni"])
+    return pl.concat(
+        [cubo["rollup"][dims].with_columns(pl.col(pl.Categorical).cast(pl.String), pl.lit(i, pl.UInt8).alias("livello"))
+         for i, dims in enumerate(livelli)],
+        how = "diagonal_relaxed"
+    )
+
+def da_pila(pila, misura = "life_exp", dimensioni = DIMENSIONI):
+    # inverso di impila: ogni rollup è una slice delle righe del suo livello, senza copie
+    # (se pila è letta con memory map, i rollup restano sui buffer del file)
+    # "livello" è ordinato: inizio e fine di ogni rollup con una ricerca binaria (un group_by allocherebbe tabelle
+    # hash grandi quanto la pila, che l'allocatore poi non restituisce)
+    livello = pila["livello"]
+    rollup = {}
+    for i, dims in enumerate(_livelli(dimensioni)):
+        inizio, fine = livello.search_sorted(i, side = "left"), livello.search_sorted(i, side = "right")
+        rollup[dims] = pila.slice(inizio, fine - inizio).select(*dims, "somma", "n", misura)
+    return {"dimensioni": dimensioni, "rollup": rollup, "indici": {}}
+
+def _indice(cubo, dims, chiavi):
+    # posizioni delle righe del rollup per ogni valore delle dimensioni chiavi (l'inizio di ORDINE): la ricerca
+    # diventa un accesso a dizionario + slice, senza copie del rollup. Gli indici si creano alla prima richiesta
+    # e restano nel cubo
+    if (dims, chiavi) in cubo["indici"]:
+        return cubo["indici"][(dims, chiavi)]
+    with _lock_indici:
+        if (dims, chiavi) not in cubo["indici"]: # altrimenti creato da un'altra sessione mentre si aspettava
+            cubo["indici"][(dims, chiavi)] = posizioni(cubo["rollup"][dims], list(chiavi))
+    return cubo["indici"][(dims, chiavi)]
+
+def fetta(cubo, per = (), **filtri):
+    # per: dimensioni lasciate libere, filtri: dimensione = valore (o lista di valori) da selezionare.
+    # ritorna le righe del rollup con le dimensioni in "per" e nei filtri, con le colonne somma, n e la media
+    dims = tuple(d for d in cubo["dimensioni"] if d in per or d in filtri)
+    valori = {d: list(v) if isinstance(v, (list, tuple)) else [v] for d, v in filtri.items()}
+    r = cubo["rollup"][dims]
+    if not valori:
+        return r
+    # le dimensioni filtrate all'inizio dell'ordine delle righe si cercano nell'indice, una slice per combinazione
+    # di valori (costo proporzionale al risultato); le altre si filtrano sulla fetta, che è già piccola
+    chiavi = tuple(takewhile(lambda d: d in valori, (d for d in ORDINE if d in dims)))
+    if chiavi:
+        pos = _indice(cubo, dims, chiavi)
+        parti = [r.slice(*pos[k]) for k in product(*(valori[d] for d in chiavi)) if k in pos]
+        if not parti:
+            return r.clear() # nessuna riga, stesso schema
+        r = pl.concat(parti) if len(parti) > 1 else parti[0]
+    altri = [pl.col(d).is_in(v) for d, v in valori.items() if d not in chiavi]
+    return r.filter(*altri) if altri else r
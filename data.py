@@ -1,74 +1,433 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+
 import polars as pl
 
-def life(url): # Life expectancy by age and sex
-    raw = pl.read_csv(url,
+from profilo import sezione
+
+# versione della pipeline di pulizia: va incrementata ogni volta che cambia il preprocessing
+# di life() o work(), così i file in cache prodotti dalla versione precedente non vengono più letti
+PIPELINE_VERSION = 5
+# cartella della cache su disco con i dataset già puliti (formato lungo) in parquet
+CACHE_DIR = Path(__file__).parent / ".cache"
+# con CACHE_IPC=1 la cache è in formato Arrow IPC non compresso (.arrow) e viene letta con memory map: i dati restano
+# nella page cache del sistema operativo, una sola copia condivisa da tutti i processi (es. più server streamlit),
+# invece di una copia decompressa per processo. Il parquet occupa meno disco, quindi resta il default
+CACHE_IPC = os.environ.get("CACHE_IPC", "0") == "1"
+ESTENSIONE = ".arrow" if CACHE_IPC else ".parquet"
+# file al massimo di un dataset in cache: gli aggiornamenti incrementali aggiungono le righe nuove in un file a parte,
+# oltre questo numero (o con righe revisionate da togliere) il dataset si riscrive in un solo file
+PARTI_MAX = 8
+# codici Eurostat che non sono paesi ma aggregati (UE, area euro, ...) o che non interessano le analisi
+AGGREGATI = ["DE_TOT", "EA19", "EA20", "EEA30_2007", "EEA31",
+             "EFTA", "EU27_2007", "EU27_2020", "EU28", "FX", "SM"]
+
+# codici usati da Eurostat che non coincidono con lo standard ISO 3166-1 alpha-2
+ECCEZIONI_ISO = {"EL": "GRC", # Grecia (ISO: GR)
+                 "UK": "GBR", # Regno Unito (ISO: GB)
+                 "XK": "XKX"} # Kosovo, codice provvisorio non presente in pycountry
+
+# tipi compatti dei dataset puliti: i codici (paesi, fasce d'età, ...) hanno poche modalità e diventano
+# Categorical (ordinati alfabeticamente, non per ordine di comparsa), il sesso un Enum con le sole tre modalità
+SESSI = pl.Enum(["F", "M", "T"])
+CODICE = pl.Categorical(ordering = "lexical")
+# niente cache globale delle stringhe (cambierebbe i Categorical di tutto il processo che importa questo modulo):
+# ogni lettura ha le sue codifiche, quindi i frame di letture diverse (es. cubo e work) si uniscono sui codici
+# come testo, vedi _testo
+
+@lru_cache(maxsize = None)
+def iso2_to_iso3(): # dizionario di conversione ISO-2 a ISO-3, costruito una volta sola per processo
+    import pycountry # serve solo quando si fa il parsing, non quando si legge dalla cache
+    return {country.alpha_2: country.alpha_3 for country in pycountry.countries} | ECCEZIONI_ISO
+
+def _hash_file(path): # hash del contenuto del file sorgente, letto a blocchi
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for blocco in iter(lambda: f.read(1 << 20), b""):
+            h.update(blocco)
+    return h.hexdigest()
+
+def _cache_path(url, nome): # file di cache: nome dataset + versione pipeline + hash del sorgente
+    return CACHE_DIR / f"{nome}-v{PIPELINE_VERSION}-{_hash_file(url)[:16]}{ESTENSIONE}"
+
+def _vecchi(nome, *estensioni): # file in cache di un dataset, di qualsiasi versione e formato
+    return [p for e in (".parquet", ".arrow") + estensioni for p in CACHE_DIR.glob(f"{nome}-*{e}")]
+
+def _leggi(url):
+    # lettura del tsv grezzo: tutte le colonne vengono lette come testo, la pulizia dei valori la fanno _parse_life/_parse_work
+    return pl.read_csv(url,
                         separator="\t",
-                        null_values=["", ":", ": "])
-    
-    df = (
+                        null_values=["", ":", ": "],
+                        infer_schema=False)
+
+def _anno(colonna): # intestazione della colonna anno -> anno, es. "1960 " -> 1960
+    return int(re.search(r"\d{4}", colonna).group())
+
+def _impronta(colonne):
+    # impronta delle celle delle colonne indicate, per ogni riga del tsv (hash di polars, su tutte le righe insieme):
+    # all'aggiornamento incrementale si confronta con quella salvata per trovare le righe revisionate da Eurostat.
+    # L'hash può cambiare tra versioni di polars, per questo nel json si salva anche la versione
+    return pl.concat_str([pl.col(c).fill_null("") for c in colonne], separator = "\t").hash(seed = 0)
+
+def _impronte(raw): # chiave grezza e impronta di tutte le colonne anno di ogni riga del tsv
+    return raw.select(pl.col(raw.columns[0]), _impronta(raw.columns[1:]).alias("impronta"))
+
+def _scrivi_cache(url, nome, df, anni, impronte, parti = None):
+    # scrive il dataset pulito e, accanto, un json con le colonne anno del sorgente da cui è stato ottenuto,
+    # l'impronta di ogni sua riga (serve all'aggiornamento incrementale per capire cosa è nuovo o cambiato) e i file
+    # che lo compongono: df è l'ultima parte, le altre (parti, nomi di file) sono già in cache
+    path = _cache_path(url, nome)
+    parti = (parti or []) + [path.name]
+    CACHE_DIR.mkdir(parents = True, exist_ok = True)
+    _pulisci_cache(nome, *(CACHE_DIR / p for p in parti), *(CACHE_DIR / p.replace(ESTENSIONE, ".json") for p in parti))
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({
+        "anni": anni, "parti": parti, "polars": pl.__version__,
+        "impronte": {"chiavi": impronte[:, 0].to_list(), "valori": impronte["impronta"].to_list()},
+    }))
+    tmp.replace(path.with_suffix(".json"))
+    return _scrivi(df, path)
+
+def _pulisci_cache(nome, *tenere):
+    # tolgo le versioni precedenti dello stesso dataset (chi le ha in memory map le vede ancora), ma non i file da
+    # tenere: con più processi avviati insieme sulla cache vuota un altro processo può aver appena scritto lo stesso
+    # file, o averne già tolto uno vecchio
+    for vecchio in _vecchi(nome, ".json"):
+        if vecchio not in tenere:
+            vecchio.unlink(missing_ok = True)
+
+def _appena_scritto(df, path):
+    # il frame appena scritto in cache, uguale a quello che ritorna _leggi_cache: dal parquet non si rilegge.
+    # Con .arrow si riapre il file con memory map, così anche il processo che lo ha scritto usa i buffer condivisi
+    if path.suffix == ".arrow":
+        return _leggi_cache(path)
+    return _codici(_testo(df))
+
+def _scrivi(df, path): # parquet o arrow ipc, secondo l'estensione di path
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    df = _testo(df) # codici come testo, vedi _codici
+    if path.suffix == ".arrow":
+        df.write_ipc(tmp, compression = "uncompressed") # non compresso: i buffer si usano direttamente dal file
+    else:
+        df.write_parquet(tmp)
+    tmp.replace(path) # rename atomico, un altro processo non legge mai un file scritto a metà
+    return path
+
+def _parti(path):
+    # file che compongono il dataset in cache: li elenca il json accanto (gli aggiornamenti incrementali aggiungono
+    # le righe nuove in un file a parte). Senza json il file è completo, es. le tabelle derivate
+    stato = path.with_suffix(".json")
+    if not stato.exists():
+        return [path]
+    return [CACHE_DIR / p for p in json.loads(stato.read_text()).get("parti", [path.name])]
+
+def _leggi_cache(path, codici = True):
+    # con memory map il frame usa i buffer del file mappato, senza copiarli (solo i codici diventano Categorical
+    # in memoria del processo, 4 byte per riga). Va letto con read_ipc: uno scan_ipc con collect copia tutto.
+    # Le parti si uniscono senza copiarle (rechunk = False) e come testo, poi i codici diventano Categorical insieme
+    leggi = (lambda p: pl.read_ipc(p, memory_map = True)) if path.suffix == ".arrow" else pl.read_parquet
+    df = pl.concat([leggi(p) for p in _parti(path)], rechunk = False)
+    return _codici(df) if codici else df
+
+def _scan_cache(path):
+    parti = _parti(path)
+    return pl.scan_ipc(parti, memory_map = True) if path.suffix == ".arrow" else pl.scan_parquet(parti)
+
+def _crea_cache(url, nome, parse): # parsing completo del sorgente e scrittura in cache, ritorna il dataset pulito
+    with sezione(f"loader/{nome}/lettura") as m:
+        raw = _leggi(url)
+        m["righe"] = raw.height
+    df = parse(raw)
+    _scrivi_cache(url, nome, df, raw.columns[1:], _impronte(raw))
+    return df
+
+def _file_cache(url, nome, parse): # ritorna il file parquet del dataset pulito, creandolo se manca
+    path = _cache_path(url, nome)
+    if not path.exists():
+        _crea_cache(url, nome, parse)
+    return path
+
+def _codici(df):
+    # nei file della cache i codici sono salvati come testo (il parquet li comprime comunque a dizionario) e
+    # diventano Categorical alla lettura: i Categorical scritti dipendono dalle codifiche del processo che li ha
+    # scritti, e polars non ne conserva l'ordinamento alfabetico.
+    # Nei dataset puliti tutte le colonne di testo sono codici
+    return df.with_columns(pl.col(pl.String).cast(CODICE))
+
+def _testo(df): # inverso di _codici: i codici come testo, per scriverli o unirli a frame di un'altra lettura
+    return df.with_columns(pl.col(pl.Categorical).cast(pl.String))
+
+def _cached(url, nome, parse, cache = True):
+    # se il sorgente non è un file locale (es. un url vero) non si può calcolare l'hash, si fa il parsing
+    if not cache or not Path(url).is_file():
+        return parse(_leggi(url))
+    path = _cache_path(url, nome)
+    if not path.exists():
+        return _appena_scritto(_crea_cache(url, nome, parse), path)
+    with sezione(f"loader/{nome}/cache") as m:
+        df = _leggi_cache(path) # chiave uguale -> si ricarica il dataset pulito
+        m["righe"] = df.height
+    return df
+
+def _aggiorna(url, nome, parse, d):
+    # aggiornamento incrementale: si parte dall'ultimo dataset pulito in cache (stessa versione della pipeline)
+    # e si analizzano solo le colonne anno nuove e le righe del sorgente nuove o revisionate. Il tsv grezzo si legge
+    # tutto (è testo, costa poco): la parte costosa è il parsing. Le righe nuove vanno in un file a parte, accanto a
+    # quelli già in cache; il dataset si riscrive solo se ci sono righe revisionate o tolte da Eurostat
+    path = _cache_path(url, nome)
+    if path.exists():
+        return path # sorgente non cambiato
+    precedenti = sorted(CACHE_DIR.glob(f"{nome}-v{PIPELINE_VERSION}-*{ESTENSIONE}"), key = lambda p: p.stat().st_mtime)
+    if not precedenti or not precedenti[-1].with_suffix(".json").exists():
+        return _file_cache(url, nome, parse) # niente da cui partire, parsing completo
+    stato = json.loads(precedenti[-1].with_suffix(".json").read_text())
+    if stato.get("polars") != pl.__version__: # impronte di un'altra versione di polars (o del vecchio formato)
+        return _file_cache(url, nome, parse)
+    anni_vecchi = {_anno(c) for c in stato["anni"]}
+
+    with sezione(f"loader/{nome}/lettura") as m:
+        raw = _leggi(url)
+        m["righe"] = raw.height
+    chiave = raw.columns[0]
+    anni_nuovi = [c for c in raw.columns[1:] if _anno(c) not in anni_vecchi]
+    # in una sola passata l'impronta sulle colonne anno già in cache, diversa da quella salvata se Eurostat ha
+    # revisionato un valore, e quella su tutte le colonne, da salvare (senza anni nuovi sono la stessa espressione)
+    impronte = raw.select(
+        chiave,
+        _impronta([c for c in raw.columns[1:] if _anno(c) in anni_vecchi]).alias("confronto"),
+        _impronta(raw.columns[1:]).alias("impronta"),
+    )
+    salvate = pl.DataFrame({chiave: stato["impronte"]["chiavi"], "salvata": stato["impronte"]["valori"]},
+                           schema_overrides = {"salvata": pl.UInt64})
+    cambiate = ( # righe revisionate o tolte dal sorgente (impronta null)
+        salvate.join(impronte, on = chiave, how = "left")
+        .filter(pl.col("confronto").ne_missing(pl.col("salvata")))[chiave]
+    )
+    rifare = impronte.join(salvate, on = chiave, how = "anti")[chiave].to_list() # righe nuove, con tutti gli anni
+
+    if cambiate.len():
+        # il dataset pulito non ha la chiave grezza: si tolgono le righe con le stesse variabili (sesso, età, paese...)
+        # delle righe cambiate e si rianalizzano tutte le righe del sorgente con quelle variabili, perché chiavi
+        # grezze diverse possono dare le stesse variabili (es. le età Y_LT1 e Y1)
+        tolte = _testo(_dividi(cambiate.to_frame(), d["campi"], d["chiavi"])).unique()
+        stesse = pl.concat([raw.select(chiave), _testo(_dividi(raw, d["campi"], d["chiavi"]))], how = "horizontal")
+        rifare += stesse.join(tolte, on = tolte.columns, how = "semi")[chiave].to_list()
+    invariate = raw.join(salvate, on = chiave, how = "semi").filter(~pl.col(chiave).is_in(rifare))
+
+    # le parti vengono da letture e parsing diversi, con codifiche dei Categorical diverse: si uniscono come testo
+    nuove = []
+    if anni_nuovi and invariate.height: # colonne anno nuove, solo per le righe già presenti e non cambiate
+        nuove.append(_testo(parse(invariate.select(chiave, *anni_nuovi))))
+    if rifare: # righe nuove o revisionate, con tutti gli anni
+        nuove.append(_testo(parse(raw.filter(pl.col(chiave).is_in(rifare)))))
+    impronte = impronte.select(chiave, "impronta")
+    if cambiate.len() or len(stato["parti"]) >= PARTI_MAX:
+        # righe da togliere (o troppe parti): tutto il dataset in un solo file
+        vecchio = _leggi_cache(precedenti[-1], codici = False)
+        if cambiate.len():
+            vecchio = vecchio.join(tolte, on = tolte.columns, how = "anti")
+        return _scrivi_cache(url, nome, pl.concat([vecchio, *nuove], how = "vertical_relaxed"), raw.columns[1:], impronte)
+    # solo righe nuove: un file in più, i precedenti restano come sono (senza righe nuove un file vuoto, per lo schema)
+    df = pl.concat(nuove, how = "vertical_relaxed") if nuove else _scan_cache(precedenti[-1]).head(0).collect()
+    return _scrivi_cache(url, nome, df, raw.columns[1:], impronte, stato["parti"])
+
+def _scan(url, nome, parse, filtri = None, colonne = None, codici = True):
+    if Path(url).is_file():
+        lf = _scan_cache(_file_cache(url, nome, parse)) # lettura lazy dalla cache
+    else:
+        lf = parse(_leggi(url)).lazy()
+    # filtri e colonne vengono spinti fino alla lettura del parquet (predicate e projection pushdown),
+    # così si materializzano solo le righe e le colonne che servono
+    if filtri is not None:
+        lf = lf.filter(filtri) if isinstance(filtri, pl.Expr) else lf.filter(*filtri)
+    if codici:
+        lf = _codici(lf)
+    else: # codici lasciati come testo: anche i filtri aggiunti dopo (es. da una query sql) arrivano alla lettura
+        lf = _testo(lf)
+    if colonne is not None:
+        lf = lf.select(colonne)
+    return lf
+
+def _derivato(url, nome, scan, calcola):
+    # dataset calcolato da quello pulito (es. i percentili della heatmap) e salvato in cache accanto a lui, con la
+    # stessa versione della pipeline e lo stesso hash del sorgente: si ricalcola solo quando cambia uno dei due
+    # (se cambia la funzione "calcola" va incrementata PIPELINE_VERSION)
+    if not Path(url).is_file():
+        return calcola(scan(url))
+    path = _cache_path(url, nome)
+    if not path.exists():
+        df = calcola(scan(url))
+        CACHE_DIR.mkdir(parents = True, exist_ok = True)
+        _pulisci_cache(nome, path)
+        return _appena_scritto(df, _scrivi(df, path))
+    return _leggi_cache(path) # DataFrame e non LazyFrame: con CACHE_IPC resta sui buffer del file mappato
+
+def life(url, cache = True): # Life expectancy by age and sex
+    return _cached(url, "life", _parse_life, cache)
+
+def work(url, cache = True): #In-Work Poverty Rate
+    return _cached(url, "work", _parse_work, cache)
+
+def scan_life(url, filtri = None, colonne = None, codici = True): # versione lazy di life(), filtri: espressione o lista
+    return _scan(url, "life", _parse_life, filtri, colonne, codici)
+
+def scan_work(url, filtri = None, colonne = None, codici = True): # versione lazy di work()
+    return _scan(url, "work", _parse_work, filtri, colonne, codici)
+
+def derivato_life(url, nome, calcola): # calcola: dal LazyFrame di scan_life(url) a un DataFrame
+    return _derivato(url, nome, scan_life, calcola)
+
+def aggiorna_life(url): # aggiornamento incrementale della cache di life(), es. quando esce un nuovo anno
+    return _aggiorna(url, "life", _parse_life, PARSE_LIFE)
+
+def aggiorna_work(url): # aggiornamento incrementale della cache di work()
+    return _aggiorna(url, "work", _parse_work, PARSE_WORK)
+
+def _stream(url, parse, righe):
+    # il file viene decompresso e letto riga per riga, e analizzato a blocchi di "righe" righe del tsv:
+    # in memoria c'è al massimo un blocco alla volta (in formato largo e lungo), indipendentemente
+    # dalla dimensione del file
+    apri = gzip.open if str(url).endswith(".gz") else open
+    with apri(url, "rb") as f:
+        intestazione = f.readline()
+        while blocco := list(islice(f, righe)):
+            raw = pl.read_csv(io.BytesIO(intestazione + b"".join(blocco)),
+                                separator="\t",
+                                null_values=["", ":", ": "],
+                                infer_schema=False)
+            yield parse(raw)
+
+def stream_life(url, righe = 10_000): # versione a blocchi di life(), ritorna un generatore di dataframe
+    return _stream(url, _parse_life, righe)
+
+def stream_work(url, righe = 10_000): # versione a blocchi di work()
+    return _stream(url, _parse_work, righe)
+
+def salva_stream(blocchi, cartella):
+    # scrive ogni blocco (es. di stream_life) in un file parquet separato nella cartella,
+    # si rilegge tutto insieme con pl.scan_parquet(cartella / "*.parquet") (i codici sono testo, vedi _codici)
+    cartella = Path(cartella)
+    cartella.mkdir(parents = True, exist_ok = True)
+    for vecchio in cartella.glob("parte-*.parquet"): # tolgo i blocchi di un'esecuzione precedente
+        vecchio.unlink()
+    for i, blocco in enumerate(blocchi):
+        _scrivi(blocco, cartella / f"parte-{i:05d}.parquet")
+    return cartella
+
+# variabili contenute nella colonna aggregata (la prima) dei due tsv
+CAMPI_LIFE = ["freq", "unit", "sex", "age", "country"]
+CAMPI_WORK = ["freq", "wstatus", "sex", "age", "unit", "geo"]
+
+def _dividi(raw, campi, chiavi):
+    # la colonna aggregata ha un valore diverso per ogni riga del tsv (poche migliaia), mentre il formato lungo ha
+    # una riga per cella: divisione e pulizia delle variabili si fanno qui, una volta per chiave composta, e i codici
+    # puliti (Categorical/Enum, quindi interi) vengono poi ricopiati sulle righe con un gather, vedi _pulisci
+    chiave = raw.columns[0] # colonna aggregata, es. "freq,unit,sex,age,geo\TIME_PERIOD"
+    return chiavi(
         raw
-        # seleziona la colonna aggregata
         .select(
-            pl.col("freq,unit,sex,age,geo\\TIME_PERIOD")
+            pl.col(chiave)
                 .str.split(",") # separazione sul testo della colonna selezionata su ","
-                .list.to_struct(fields=["freq", "unit", "sex", "age", "country"]) 
-                .alias("combined"), # quello che si vuole tanto viene eliminata
-            pl.col("*").exclude("freq,unit,sex,age,geo\\TIME_PERIOD") # eliminata la colonna con tutte le var. aggregate
+                .list.to_struct(fields=campi)
+                .alias("combined") # quello che si vuole tanto viene eliminata
         )
         .unnest("combined")# una nuova colonna per ogni variabile
-        #
-        .unpivot( # trasformiamo gli anni che sono variabili, in modalità delle osservazioni
-                  # i valori che assomevano diventano modalità della nuova variable "life_exp"
-            index=["freq", "unit", "sex", "age", "country"],# variabili(colonne) che non vengono toccate
-            variable_name="year",# nuova colonna che contiene i nomi delle variabili non in index
-            value_name="life_exp"# nuova colonna che contiene i valori delle colonne non in index
-        )
-        #
-        .with_columns(
-            
-            pl.col("year").str.replace(" ", "").cast(pl.Int64), # sostituisce spazi con ""
-            # qualsiasi cosa che non sia un numero o un punto decimale -> ""
-
-            # sostituisce tutto tranne numeri e "." con ""
-            pl.col("life_exp").str.replace_all(r"[^0-9\.]", "").cast(pl.Float64),#[^   ] negazione, fuori da [] indica
-            # una parola che unizia con x - ^x --- \ carattere di escape --- senza r" " \\ 
-            pl.col("country").str.replace(r"[\[\]]", "").alias("country"), #sostituisce [] con "", togliendole
-            # togliamo da "age" tutto ciò che non sono numeri
-            pl.col("age").str.replace_all(r"[^0-9]", "").cast(pl.Int64)
-        )
-        .drop_nulls("life_exp") # togliamo per sicurezza eventuali valori nulli di "life_exp"
     )
-    df = df.select(
-    pl.col("*").exclude("freq", "unit")) # togliamo le colonne "freq" e "unit" che non ci servono per le analisi
-    
-    return df
 
-def work(url): #In-Work Poverty Rate
-    raw = pl.read_csv(url,
-                        separator="\t",
-                        null_values=["", ":", ": "])
+def _unpivot(raw, valore, anno):
+    # trasformiamo gli anni che sono variabili, in modalità delle osservazioni. Le intestazioni (es. "1960 ")
+    # si decodificano una volta per colonna, poi le colonne anno vengono messe una sotto l'altra con l'anno come
+    # costante; "riga" è la posizione nel tsv, cioè della chiave composta in _dividi
+    anni = (
+        pl.DataFrame({"colonna": raw.columns[1:]})
+        .with_columns(anno(pl.col("colonna")).alias("year"))
+        .drop_nulls("year") # intestazioni che non sono anni
+    )
+    larga = raw.lazy().with_row_index("riga")
+    return pl.concat([
+        larga.select("riga", pl.lit(a, pl.Int16).alias("year"), pl.col(c).alias(valore))
+        for c, a in anni.iter_rows()
+    ]).collect()
 
-    df = (raw
-        .select(
-            pl.col("freq,wstatus,sex,age,unit,geo\\TIME_PERIOD")
-                .str.split(",")# separazione della colonna su ","
-                .list.to_struct(fields=["freq", "wstatus", "sex", "age", "unit", "geo"])
-                .alias("combined"),
-            pl.col("*").exclude("freq,unit,sex,age,geo\\TIME_PERIOD")# togliamo la colonna iniziale aggregata
-        )
-        .unnest("combined")# una nuova colonna per ogni variabile
-        .unpivot(
-            index=["freq", "wstatus", "sex", "age", "unit", "geo"],# variabili(colonne) che non vengono toccate
-            variable_name="year",# nuova colonna che contiene i nomi delle variabili non in index
-            value_name="poverty_rate"# nuova colonna che contiene i valori delle colonne non in index
-        )
-        .with_columns(
-            pl.col("year").str.extract(r"(\d{4})").cast(pl.Int64), # estrae solo valori con 4 cifre consecutive
-            pl.col("poverty_rate").str.extract(r"(\d+(\.\d+)?)").cast(pl.Float64), # estrae numeri interi o con il punto
-            # estrae più cifre prima del . e poi più cifre dopo se ci sono(?)
-            pl.col("geo").str.replace(r"[\[\]]", "").alias("country") #sostituisce [] con ""
-        )
-        .drop_nulls("year")# togliamo per sicurezza eventuali valori nulli di "year"
-        .drop_nulls("poverty_rate")# togliamo per sicurezza eventuali valori nulli di "poverty_rate"
+def _pulisci(lungo, diviso, valore, misura, ordine):
+    # per ogni cella si analizza solo il valore (numero con eventuali flag, es. "80.5 e"), le variabili della
+    # chiave composta arrivano già pulite da _dividi
+    lungo = (
+        lungo
+        .with_columns(misura(pl.col(valore)))
+        .drop_nulls(valore) # togliamo per sicurezza eventuali valori nulli
+    )
+    return pl.concat(
+        [diviso.select(pl.all().gather(lungo["riga"])), lungo.select("year", valore)],
+        how = "horizontal"
+    ).select(ordine)
+
+def _chiavi_life(df):
+    return df.select( # togliamo le colonne "freq" e "unit" che non ci servono per le analisi
+        pl.col("sex").cast(SESSI),
+        # togliamo da "age" tutto ciò che non sono numeri
+        pl.col("age").str.replace_all(r"[^0-9]", "").cast(pl.Int8), # età fino a 85
+        pl.col("country").str.replace(r"[\[\]]", "").cast(CODICE), #sostituisce [] con "", togliendole
+    )
+    # il codice iso3 non si salva su ogni riga: dipende solo dal paese, lo calcola paesi_iso3() per le mappe
+
+def _anno_life(colonna):
+    return colonna.str.replace(" ", "").cast(pl.Int16) # sostituisce spazi con ""
+
+def _valore_life(colonna):
+    # qualsiasi cosa che non sia un numero o un punto decimale -> ""
+    # sostituisce tutto tranne numeri e "." con ""
+    return colonna.str.replace_all(r"[^0-9\.]", "").cast(pl.Float32)#[^   ] negazione, fuori da [] indica
+    # una parola che unizia con x - ^x --- \ carattere di escape --- senza r" " \\ 
+
+def _chiavi_work(df):
+    return df.select( # frequenza e unità hanno un solo valore, geo è uguale a country
+        pl.col("wstatus").cast(CODICE),
+        pl.col("sex").cast(SESSI),
+        pl.col("age").cast(CODICE),
+        pl.col("geo").str.replace(r"[\[\]]", "").cast(CODICE).alias("country"), #sostituisce [] con ""
     )
-    return df
\ No newline at end of file
+
+def _anno_work(colonna):
+    return colonna.str.extract(r"(\d{4})").cast(pl.Int16) # estrae solo valori con 4 cifre consecutive
+
+def _valore_work(colonna):
+    return colonna.str.extract(r"(\d+(\.\d+)?)").cast(pl.Float32) # estrae numeri interi o con il punto
+    # estrae più cifre prima del . e poi più cifre dopo se ci sono(?)
+
+# le tre parti del tsv di ogni dataset: variabili della chiave composta, intestazioni anno, valori;
+# ordine: colonne del dataset pulito
+PARSE_LIFE = {"campi": CAMPI_LIFE, "chiavi": _chiavi_life, "anno": _anno_life, "valore": "life_exp",
+        "misura": _valore_life, "ordine": ["sex", "age", "country", "year", "life_exp"]}
+PARSE_WORK = {"campi": CAMPI_WORK, "chiavi": _chiavi_work, "anno": _anno_work, "valore": "poverty_rate",
+        "misura": _valore_work, "ordine": ["wstatus", "sex", "age", "year", "poverty_rate", "country"]}
+
+def _parse(raw, nome, d):
+    # le tre fasi del preprocessing: divisione della colonna aggregata, unpivot degli anni, pulizia dei valori
+    with sezione(f"parse/{nome}/split") as m:
+        diviso = _dividi(raw, d["campi"], d["chiavi"])
+        m["righe"] = diviso.height
+    with sezione(f"parse/{nome}/unpivot") as m:
+        lungo = _unpivot(raw, d["valore"], d["anno"])
+        m["righe"] = lungo.height
+    with sezione(f"parse/{nome}/regex") as m:
+        df = _pulisci(lungo, diviso, d["valore"], d["misura"], d["ordine"])
+        m["righe"] = df.height
+    return df
+
+def _parse_life(raw):
+    return _parse(raw, "life", PARSE_LIFE)
+
+def _parse_work(raw):
+    return _parse(raw, "work", PARSE_WORK)
+
+if __name__ == "__main__": # aggiornamento notturno della cache: python data.py
+    aggiorna_life("estat_demo_mlexpec.tsv.gz")
+    aggiorna_work("estat_ilc_iw01.tsv.gz")
@@ -0,0 +1,24 @@
+from functools import wraps
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import profilo
+
+# sezioni delle pagine come st.fragment: un widget della sezione (slider, selectbox, ...) riesegue solo la sua
+# funzione, non tutta la pagina né app.py, quindi il tempo di risposta è quello del grafico toccato.
+# Nei rerun parziali app.py non viene eseguito: le misure del profilo ripartono da zero e si esportano qui
+# (il pannello di debug nella sidebar mostra l'ultimo rerun completo)
+
+def frammento(fn):
+    @st.fragment
+    @wraps(fn)
+    def f(*args, **kwargs):
+        ctx = get_script_run_ctx()
+        parziale = bool(ctx and ctx.fragment_ids_this_run) # rerun del solo frammento
+        if parziale:
+            profilo.inizia()
+        fn(*args, **kwargs)
+        if parziale:
+            profilo.esporta(sessione = ctx.session_id, frammento = fn.__name__)
+    return f
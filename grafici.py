@@ -0,0 +1,214 @@
+import altair as alt
+import polars as pl
+
+from payload import minimizza
+
+# costruzione dei grafici della dashboard a partire dai dati di query.py, senza streamlit:
+# le pagine li mostrano, ma si possono anche salvare o esportare da altri script
+
+def _con_anno(dati, colonne): # colonne del payload, più l'anno se i dati sono di tutti gli anni
+    return (["year"] if "year" in dati.columns else []) + colonne
+
+def _anno_nel_browser(grafico, dati, anno):
+    # dati di tutti gli anni (colonna year): un parametro vega-lite legato a uno slider filtra le righe nel browser,
+    # quindi cambiare anno non fa rerun né ricalcoli lato server. Con i dati di un solo anno il grafico resta com'è
+    if "year" not in dati.columns:
+        return grafico
+    anni = dati["year"]
+    slider = alt.binding_range(min = anni.min(), max = anni.max(), step = 1, name = "Scegli un anno ")
+    p = alt.param(name = "anno", value = anno, bind = slider)
+    return grafico.add_params(p).transform_filter(alt.datum.year == p)
+
+def barre(bar_chart_data, anno = 2003):
+    base = (_anno_nel_browser(alt.Chart(minimizza(bar_chart_data, _con_anno(bar_chart_data, ["country", "average"]))),
+                              bar_chart_data, anno)
+            .encode(
+                    alt.X("country:N", title = "Paesi", sort = "-y"),
+                    alt.Y("average:Q", title = "Aspettativa di vita media"),
+                    text = "average",
+            )
+            .properties(
+                width = alt.Step(21),
+                height = 400
+            )
+    )
+    return base.mark_bar() + base.mark_text(align="center", dy=-10, dx=0)
+
+def sessi(sex_data, anno = 2003):
+    return _anno_nel_browser(
+        alt.Chart(minimizza(sex_data, _con_anno(sex_data, ["country", "sex", "average_life_exp"]))), sex_data, anno
+    ).mark_bar().encode(
+        x=alt.X("average_life_exp:Q", title="Aspettativa di vita media"),
+        y=alt.Y("sex:N", title="Sesso"),
+        color=alt.Color("sex:N", title="Sesso"),
+        row=alt.Row("country:N", title="Paesi", spacing=10)
+    ).properties(
+        width=600,
+        height=30
+    ).configure_view(
+        continuousHeight=400
+    )
+
+def mappa(df, colore, anno = 2003):
+    # plotly serve solo alle mappe: importato qui, così chi non le mostra non ne paga il caricamento
+    import plotly.express as px
+
+    # una sola figura con un frame per anno (df con i dati di tutti gli anni): l'anno si sceglie con
+    # lo slider della figura, che cambia frame nel browser senza rerun né ricalcoli
+    fig = px.choropleth(
+        df,
+        locationmode = "ISO-3",
+        locations = "country_iso3",
+        color = colore,
+        hover_name = "country_iso3",
+        animation_frame = "year",
+        range_color = (df[colore].min(), df[colore].max()), # stessa scala di colori per tutti gli anni
+        color_continuous_scale = px.colors.sequential.Viridis_r,
+        scope = "europe",
+        width = 800,
+        height = 600,
+        projection="azimuthal equal area"
+    )
+    # frame mostrato all'apertura: quello dell'anno scelto, o l'ultimo se nei dati quell'anno non c'è
+    nomi = [f.name for f in fig.frames]
+    if nomi:
+        inizio = nomi.index(str(anno)) if str(anno) in nomi else len(nomi) - 1
+        fig.update(data = fig.frames[inizio].data)
+        if fig.layout.sliders: # con un solo anno plotly non crea lo slider
+            fig.layout.sliders[0].active = inizio
+    return fig
+
+def trend_globale(global_trend_data):
+    return (
+        alt.Chart(minimizza(global_trend_data, ["year", "global_average"]))
+        .mark_line(point = True)
+        .encode(
+            alt.X("year:O", title = "Anno"),
+            alt.Y("global_average:Q", title = "Aspettativa di vita media globale", scale = alt.Scale(domain = [68, 82])),
+            tooltip=["year", "global_average"]
+        )
+        .properties(
+            width = 800,
+            height = 400
+        )
+    )
+
+def trend(filtered_df):
+    return (
+        alt.Chart(minimizza(filtered_df, ["country", "sex", "year", "life_exp"]))
+        .mark_line()
+        .encode(
+            alt.X("year:O", title = "Anno").scale(zero=False),
+            alt.Y("life_exp:Q", title = "Aspettativa di vita media", scale = alt.Scale(domain = [55, 90])),
+            alt.Facet("sex:N", columns = 2),  # mette i grafici uno di fianco all'altro invece che uno sotto l'altro
+            color = alt.Color("country:N"),
+            tooltip = ["country", "year", "life_exp"],
+        )
+        .properties(
+            width = 300,
+            height = 300
+        )
+    )
+
+def anomalie(top_countries, anno = 2003):
+    return (
+        _anno_nel_browser(
+            alt.Chart(minimizza(top_countries, _con_anno(top_countries, ["country", "deviation_from_mean"]))),
+            top_countries, anno
+        )
+        .mark_bar()
+        .encode(
+            alt.X("deviation_from_mean:Q", title = "Deviazione dalla media europea"),
+            alt.Y("country:N", sort = "-x", title = "Paesi"),
+            tooltip = ["country", "deviation_from_mean"]
+        )
+        .properties(
+            width = 600,
+            height = alt.Step(20)
+        )
+    )
+
+def heatmap(data):
+    # una cella per (anno, età, sesso): le età duplicate nel dataset (es. Y_LT1 e Y1) non vengono mandate due volte
+    return (
+        alt.Chart(minimizza(data, ["year", "age", "sex", "Percentile"], chiavi = ["year", "age", "sex"]))
+        .mark_rect(stroke = None, opacity = 1)
+        .encode(
+            alt.X("year:O", title = "Anno"),
+            alt.Y("age:O", sort="descending", title = "Età"),
+            alt.Color("Percentile:Q", scale=alt.Scale(scheme="inferno")),
+            alt.Facet("sex:N")
+        )
+        .properties(
+            height= 250,
+            width = 650
+            )
+    )
+
+def correlazione(df_filtered, df_filtered_join):
+    # grafico aspettativa di vita media
+    life_exp_chart = (
+        alt.Chart(minimizza(df_filtered.filter(pl.col("metric") == "life_exp_mean"), ["year", "value"]))
+        .mark_line(color="blue", point=True)
+        .encode(
+            x=alt.X("year:O", title="Anno"),
+            y=alt.Y("value:Q", title="Aspettativa di Vita Media", scale=alt.Scale(zero=False)),
+            tooltip=["year", "value"]
+        )
+    )
+
+    # grafico tasso di lavoratori a rischio di povertà medio
+    poverty_chart_p = (
+        alt.Chart(minimizza(df_filtered.filter(pl.col("metric") == "poverty_rate_mean"), ["year", "value"]))
+        .mark_line(color="orange")
+        .encode(
+            x=alt.X("year:O", title="Anno"),
+            y=alt.Y("value:Q", title="Tasso di Povertà Medio",
+                    scale=alt.Scale(zero=False),
+                    axis=alt.Axis(titleColor="orange")),
+            tooltip=["year", "value"]
+        )
+        .transform_calculate(  # serve per avere un asse separato
+            Value="datum.Value * 1"
+        )
+    )
+    # punti per tasso di lavoratori a rischio di povertà medio
+    points_poverty = (
+        alt.Chart(minimizza(df_filtered_join, ["year", "poverty_rate_mean"]))
+        .mark_point(color="orange", shape="diamond", fill="orange")
+        .encode(
+            x=alt.X("year:O"),
+            y=alt.Y("poverty_rate_mean:Q"),
+            tooltip=["year", "poverty_rate_mean"]
+        )
+    )
+    # combina i due grafici
+    poverty_chart = poverty_chart_p + points_poverty
+    return (
+        alt.layer(
+            life_exp_chart,
+            poverty_chart
+        )
+        .resolve_scale(
+            y="independent"  # assi y indipendenti
+        )
+        .properties(
+            width=800,
+            height=400,
+        )
+    )
+
+def correlazione_mobile(df_mobile):
+    return (
+        alt.Chart(minimizza(df_mobile, ["year", "correlazione"]))
+        .mark_line(point = True)
+        .encode(
+            alt.X("year:O", title = "Anno"),
+            alt.Y("correlazione:Q", title = "Correlazione", scale = alt.Scale(domain = [-1, 1])),
+            tooltip = ["year", "correlazione"]
+        )
+        .properties(
+            width = 800,
+            height = 250
+        )
+    )
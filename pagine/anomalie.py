@@ -0,0 +1,40 @@
+import streamlit as st
+
+import grafici
+import query
+from frammenti import frammento
+from profilo import sezione
+
+with sezione("caricamento/life") as m:
+    m["righe"] = query.df().height
+with sezione("caricamento/cubo"):
+    query.cubo()
+years = query.years() # anni
+
+st.markdown(f"""
+            #### Anomalie principali rispetto alla media europea per Anno
+""")
+@frammento
+def anomalie(): # lo slider riesegue solo questa sezione
+    browser = st.session_state.get("anno_browser", False) # anno scelto nel grafico (toggle nella sidebar)
+    if not browser:
+        year_select4 = st.select_slider("Scegli un anno", years, key = "slider_4", value = 2003)# scelta anno da utenmte
+
+    with sezione("anomalie/dati") as m:
+        top_countries = query.anomalie_anni() if browser else query.anomalie(year_select4) # con tutti gli anni, i primi 10 di ogni anno
+        m["righe"] = top_countries.height
+
+    with sezione("anomalie/grafico"):
+        st.altair_chart(grafici.anomalie(top_countries), use_container_width = True)
+
+anomalie()
+st.markdown(f"""
+            Questo grafico ci permette di visualizzare i 10 paesi che presentano le maggiori **deviazioni**
+            dall'aspettativa di vita media europea per l'anno selezionato. In particolare mostra i 5 paesi 
+            con la più alta deviazione positiva, cioè con una aspettativa di vita superiore alla media europea,
+            e i 5 paesi con la maggiore deviazione negativa, quindi con un'aspettativa di vita inferiore alla media europea.
+             L'asse X mostra la deviazione dalla media, mentre l'asse Y riporta i paesi.
+
+            Permette di avere un'idea generale di quali paesi siano messi meglio e quali peggio, a livello europeo, 
+            sull'aspettativa di vita e quindi sulle condizioni di salute generali del paese, rispetto all'anno selezionato.
+""")
@@ -0,0 +1,38 @@
+import streamlit as st
+
+st.markdown(f"""
+            ### CONCLUSIONI
+            Le principali conclusioni, che sono messe in evidenza dall'analisi dei dati
+            sull'aspettativa di vita e il tasso di lavoratori a rischio povertà nei paesi europei, sono:
+
+            - L'aspettativa di vita sembra sia cresciuta costantemente dal 1960,
+            grazie a migliori condizioni sanitarie e socioeconomiche. Si riscontrano però anche periodi
+            di cali temporanei, che si possono attribuire a fattori quali guerre o pandemie (es. covid 2020/2021).
+            - Le donne mostrano una maggiore aspettativa di vita rispetto uomini in tutti i paesi analizzati,
+            ma il divario tra i sessi varia significativamente da paese a paese.
+            - E' emersa una correlazione positiva più o meno evidente tra il tasso di povertà dei lavoratori e l'aspettativa di vita,
+            per alcuni paesi europei, mentre per altri incorrelazione o una lieve correlazione negativa,
+            questo può indicare che ci sono altri fattori non osservati che giocano un ruolo importante.
+            E siccome correlazione non implica causalità, potrebbe essere un caso di correlazione spuria tra le
+            due variabili osservate.
+
+            Questi risultati offrono una panoramica utile per comprendere l'evoluzione della salute pubblica in Europa,
+            fornendo spunti per ulteriori analisi.
+""")
+st.divider()
+st.markdown(f"""
+            ### FONTI
+    **Dataset**: 'Life expectancy by age and sex'
+            
+    **Descrizione**: Misura l'aspettativa di vita, suddivisa per anno, paese (esclusivamente del continente europeo), sesso ed età.
+                 Il periodo coperto è dal 1960 al 2023.
+            
+    **Fonte**: [Eurostat :chart:](https://ec.europa.eu/eurostat/databrowser/view/demo_mlexpec/default/table?lang=en&category=demo.demo_mor)
+            
+    **Dataset**: 'In-work at-risk-of-poverty rate by age and sex'
+            
+    **Descrizione**: Misura il tasso dei lavoratori a rischio di povertà, suddivisa per anno, paese (esclusivamente del continente europeo), sesso ed età (fascie di età).
+                 Il periodo coperto è dal 2003 al 2023. 
+            
+    **Fonte**: [Eurostat :chart:](https://ec.europa.eu/eurostat/databrowser/view/ilc_iw01/default/table?lang=en&category=livcon.ilc.ilc_ip.ilc_iw)
+""")
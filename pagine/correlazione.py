@@ -0,0 +1,90 @@
+import streamlit as st
+
+import correlazioni as corr
+import grafici
+import query
+from frammenti import frammento
+from profilo import sezione
+
+# il dataset dei lavoratori a rischio povertà viene letto solo quando si apre questa pagina
+with sezione("join/dati") as m:
+    df_join = query.df_join()
+    m["righe"] = df_join.height
+
+st.markdown(f"""
+            #### Correlazione tra Aspettativa di Vita Media e Tasso Lavoratori a Rischio Povertà Medio per Paese
+""")
+@frammento
+def correlazione_paese(): # la scelta del paese riesegue solo i grafici del paese
+    # paesi da scegliere
+    countries_join = query.countries_join()
+    # scelta utente
+    country_select = st.selectbox("Scegli un Paese", countries_join)
+    with sezione("correlazione/dati") as m:
+        df_filtered, df_filtered_join, correlation_value = query.correlazione(country_select)
+        m["righe"] = df_filtered_join.height
+    if correlation_value is None: # meno di ANNI_MIN anni in comune
+        correlation_value = f"non calcolata (meno di {corr.ANNI_MIN} anni in comune)"
+
+    with sezione("correlazione/grafico"):
+        st.altair_chart(grafici.correlazione(df_filtered, df_filtered_join), use_container_width=True)
+
+    st.markdown(f"""
+                Paese selezionato: {country_select}
+
+                Correlazione: {correlation_value}
+
+                Il grafico presenta due scale verticali:
+
+                L'asse sinistro (in blu) rappresenta l'aspettativa di vita media in anni.
+                L'asse destro (in arancione) mostra il tasso di lavoratori a rischio di povertà medio (%).
+                Le linee tracciate, per il paese selezionato, seguono i valori osservati per entrambe le metriche nel corso degli anni.
+
+                La visualizzazione consente di individuare eventuali correlazioni o divergenze tra i due trend,
+                mostrando come l'andamento socioeconomico potrebbe influenzare la salute pubblica.
+
+                Il grafico evidenzia che, per alcuni paesi europei, emerge una leggera relazione positiva più o meno stretta tra
+                aspettativa di vita media e tasso di lavoratori a rischio povertà medio. E' però importante ricordare che 
+                **correlazione non implica causalità** e che ci potrebbero essere altri fattori non osservati, come accesso
+                ai servizi sanitari, educazione e politiche pubbliche, che possono influenzare il risultato.
+
+                Una mia possibile interpretazione dei risulati è che col tempo l'igiene personale e i servizi sanitari
+                sono migliorati e diventati più accessibili, quindi anche chi è **considerato** a rischio di povertà
+                può permettersi acqua potabile, cibo e medicine. Portando quindi a influire di più sulla **qualità**
+                della vita rispetto alla sua **durata**.
+    """)
+
+    @frammento
+    def correlazione_mobile(country_select): # lo slider riesegue solo il grafico mobile
+        finestra = st.slider("Anni per finestra", corr.ANNI_MIN, 10, corr.ANNI_MIN, key = "slider_finestra")
+        with sezione("correlazione_mobile/dati") as m:
+            df_mobile = query.correlazione_mobile(finestra, country_select)
+            m["righe"] = df_mobile.height
+        with sezione("correlazione_mobile/grafico"):
+            st.altair_chart(grafici.correlazione_mobile(df_mobile), use_container_width = True)
+        st.markdown(f"""
+                    Correlazione **mobile** per {country_select}: per ogni anno è calcolata sugli ultimi anni della finestra scelta,
+                    così si vede se la relazione tra le due variabili è cambiata nel tempo.
+        """)
+
+    correlazione_mobile(country_select)
+
+correlazione_paese()
+
+### TUTTI I PAESI
+st.markdown(f"""
+            ##### Correlazione per tutti i Paesi
+""")
+with sezione("correlazioni/dati") as m:
+    tabella = query.correlazioni()
+    m["righe"] = tabella.height
+st.dataframe(tabella, hide_index = True)
+st.markdown(f"""
+            La tabella riporta per ogni paese la correlazione tra le due variabili, gli anni in comune e
+            l'**intervallo di confidenza** al 95% (ic_basso, ic_alto), stimato ricampionando gli anni 1000 volte.
+            Un intervallo che contiene lo 0, come capita per i paesi con pochi anni, indica una correlazione non
+            distinguibile dal caso. Le ultime due colonne mostrano il **ritardo** (0-3 anni) con la correlazione più forte
+            tra il tasso di povertà di un anno e l'aspettativa di vita degli anni successivi.
+            Correlazioni, intervalli e ritardi calcolati su meno di {corr.ANNI_MIN} anni in comune non sono riportati:
+            con così pochi punti la correlazione è vicina a ±1 anche tra serie indipendenti.
+""")
@@ -0,0 +1,40 @@
+import streamlit as st
+
+import grafici
+import query
+from frammenti import frammento
+from profilo import sezione
+
+with sezione("caricamento/life") as m:
+    m["righe"] = query.df().height
+countries = query.countries() # paesi
+countries_list = countries["country"].to_list()  # colonna "country" in lista, per usarla come indice
+st.markdown(f"""
+            #### Andamento dell'aspettativa di vita per tutte le Età per Paese
+""")
+@frammento
+def heatmap(): # la scelta del paese riesegue solo questa sezione
+    # scelta utente del paese
+    countrie_select = st.selectbox("Scegli un paese", countries_list, index = countries_list.index("IT"), key = "selectbox_0")
+
+    with sezione("heatmap/dati") as m:
+        data = query.heatmap(countrie_select)
+        m["righe"] = data.height
+
+    with sezione("heatmap/grafico"):
+        st.altair_chart(grafici.heatmap(data), use_container_width=False)
+
+heatmap()
+
+st.markdown(f"""
+            Questo grafico analizza come l'aspettativa di vita media varia tra diverse fasce di età e come cambia nel tempo,
+            per il paese selezionato dall'utente, suddiviso per genere.
+            Il grafico in alto mostra le osservazioni per le femmine, mentre quello in basso per i maschi, inoltre
+            l'asse X rappresenta gli anni, l'asse Y mostra le età e il colore indica il **percentile** dell'aspettativa
+            di vita, in particolare colorazioni più scure indicano percentili più bassi, mentre quelle più chiare
+            percentili più alti.
+            Ci permette quindi di identificare **cambiamenti storici** nell'aspettativa di vita di una popolazione
+            e di notare differenze per diverse età e sesso.
+
+            :red[NOTA:] in questa analisi sono state usate tutte le età disponibili nel dataset
+            """)
@@ -0,0 +1,52 @@
+import streamlit as st
+
+import grafici
+import query
+from profilo import sezione
+
+@st.cache_resource
+def mappa_animata(nome, colore): # figura costruita una volta per processo, condivisa tra le sessioni
+    return grafici.mappa(getattr(query, f"{nome}_anni")(), colore)
+
+with sezione("caricamento/life") as m:
+    m["righe"] = query.df().height
+with sezione("caricamento/cubo"):
+    query.cubo()
+
+st.write(f"""#### Analisi grafiche sulla cartina d'Europa""")
+st.markdown(f"""
+            ##### Aspettativa di Vita media per Anno
+""")
+with sezione("mappa/grafico") as m: # figura costruita una volta per processo
+    m["righe"] = query.mappa_anni().height
+    st.plotly_chart(mappa_animata("mappa", "asp. di vita media"))
+
+st.markdown(f'''
+            La mappa visualizza l'**aspettativa di vita media** nei paesi europei per l'anno selezionato.
+            Ogni paese europeo è colorato in base alla scala cromatica Viridis_r, mostrata accanto alla mappa:
+            i colori scuri indicano valori più alti, quelli chiari valori più bassi.
+
+            La mappa ci permette di avere una visualizzazione facilmente interpretabile e
+            di cogliere facilmete **differenze** o **somiglianze** tra i vari paesi o individuare
+            eventuali pattern geografici, per esempio risulta che i paesi europei occidentali tendano ad avere
+            aspettative di vita medie più alte rispetto alla parte orientale.
+''')
+
+### CARTINA GEOGRAFICA GAP SESSI
+st.markdown(f"""
+            ##### Gap tra Sessi per Anno
+""")
+with sezione("gap_mappa/grafico") as m:
+    m["righe"] = query.gap_mappa_anni().height
+    st.plotly_chart(mappa_animata("gap_mappa", "Deviazione"))
+
+st.markdown(f'''
+            La mappa mostra la **differenza** tra l'aspettativa di vita delle femmine con quella dei maschi
+            per l'anno selezionato, con colori che indicano l'ampiezza della deviazione. In particolare i paesi
+            in cui il colore è più scuro indicano una maggiore disparità tra i sessi, mentre colori più chiari
+            rappresentano valori più vicini.
+
+            La mappa permette di osservare visivamente le **disparità di genere** in termini di 
+            aspettativa di vita, evidenziando paesi con una differenza maggiore o minore tra 
+            i due sessi.
+''')
@@ -0,0 +1,91 @@
+import streamlit as st
+
+import query
+from frammenti import frammento
+from profilo import sezione
+
+st.write(f"""### INDRODUZIONE""")
+
+st.markdown(f"""**OBIETTIVO**: Analizzare l'aspettativa di vita per studiare un indice della
+            salute generale per i diversi paesi europei e fare un confronto tra sesso, anno e paese.
+            Alla fine si studia se esiste una correlazione tra l'aspettativa di vita e il tasso
+            di povertà dei lavoratori.
+""")
+
+st.markdown(f"""**OSSERVAZIONI**: Le analisi sono state effettuate con la sola fascia d'età <=1 anno, tranne se specificato
+            diversamente in singole analisi, per diversi motivi. I principali sono una maggiore
+            chiarezza dei risultati e perché rappresenta un indicatore della salute generale della popolazione,
+            strettamente legato alla mortalità infantile, all'igiene, alla sanità pubblica e al contesto socioeconomico.
+""")
+
+# grafici (e con loro altair) e dati caricati dopo l'introduzione, così il testo compare subito
+import grafici
+
+# dati condivisi del processo: li carica la prima pagina aperta che li usa (se il preriscaldamento non li ha già in
+# memoria), poi ~0 ms. Le altre pagine hanno le stesse sezioni
+with sezione("caricamento/life") as m:
+    m["righe"] = query.df().height
+with sezione("caricamento/cubo"):
+    query.cubo()
+countries = query.countries() # paesi
+years = query.years() # anni
+
+st.divider()
+st.write(f"""#### Analisi sull'aspettativa di vita media""")
+
+#### GRAFICO A BARRE --- modifica numeri con colonna aggiuntiva più alta
+st.markdown(f"""
+            ##### Confronto tra Paesi per Anno
+""")
+@frammento
+def barre(): # lo slider riesegue solo questa sezione
+    browser = st.session_state.get("anno_browser", False) # anno scelto nel grafico (toggle nella sidebar)
+    if not browser:
+        year_select0 = st.select_slider("Scegli un anno", years, key = "slider_0", value = 2003)# scelta anno da utente
+
+    with sezione("barre/dati") as m:
+        bar_chart_data = query.bar_chart_anni() if browser else query.bar_chart(year_select0)
+        m["righe"] = bar_chart_data.height
+
+    with sezione("barre/grafico"):
+        st.altair_chart(grafici.barre(bar_chart_data), use_container_width=False)
+
+barre()
+
+st.markdown(f'''
+            Il grafico a barre evidenzia l'**aspettativa di vita media** nei vari paesi europei nell'anno scelto tramite lo slider.
+            Sull'asse X si trovano i nomi dei paesi, rappresentati da una barra, mentre sull'asse Y è riportata
+            l'aspettativa di vita media. Questo tipo di visualizzazione permette di osservare differenze
+            significative tra i paesi.
+''')
+
+### CONFRONTO SESSI --- altair altro grafico
+st.markdown(f"""
+            ##### Confronto tra Sessi per Paese ed Anno
+""")
+@frammento
+def sessi():
+    browser = st.session_state.get("anno_browser", False)
+    if not browser:
+        year_select1 = st.select_slider("Scegli un anno", years, key = "slider_1", value = 2003)# scelta anno da utente
+    selected_countries = st.multiselect("Scegli uno o più paesi", countries, default = ["IT", "BE", "CH"], key = "multiselec0")
+
+    with sezione("sessi/dati") as m:
+        # con l'anno nel browser i paesi restano una scelta lato server: cambiarli ricalcola i dati di tutti gli anni
+        sex_data = query.sex_anni(tuple(selected_countries)) if browser else query.sex(year_select1, tuple(selected_countries))
+        m["righe"] = sex_data.height
+
+    with sezione("sessi/grafico"):
+        st.altair_chart(grafici.sessi(sex_data), use_container_width=False)
+
+sessi()
+
+st.markdown('''
+            Il grafico a barre confronta l'**aspettativa di vita media** tra femmine e maschi
+            nei diversi paesi scelti e per l'anno selezionato.
+            L'asse X mostra l'aspettativa di vita media mentre l'asse Y riporta i paesi, ognuno dei quali ha 2 barre,
+            una per sesso, colorata come da legenda. Questo tipo di visualizzazione consente di osservare
+            rapidamente le **disparità**, se esistenti, tra i due sessi in termini di aspettativa di vita
+            e di confrontarle tra i vari paesi europei.
+
+''')
@@ -0,0 +1,39 @@
+import streamlit as st
+import polars as pl
+
+import sql
+from frammenti import frammento
+from profilo import sezione
+
+# console sql per le analisi che le altre pagine non offrono: le tabelle sono gli scan dei dataset puliti in cache,
+# quindi una query legge solo le colonne e le righe che le servono
+st.markdown(f"""
+            #### Console SQL
+""")
+if not sql.CONSOLE: # la pagina è nella navigazione solo con CONSOLE_SQL=1, vedi app.py
+    st.info("Console SQL disattivata: si attiva avviando la dashboard con CONSOLE_SQL=1")
+    st.stop()
+
+@frammento
+def console(): # eseguire una query riesegue solo la console
+    testo = st.text_area("Query", sql.ESEMPIO, height = 180, key = "sql_testo")
+    with st.expander("Tabelle disponibili"):
+        for nome, schema in sql.tabelle().items():
+            st.markdown(f"**{nome}**: " + ", ".join(f"`{c}` ({t})" for c, t in schema.items()))
+
+    if testo.strip():
+        try:
+            with sezione("sql/esecuzione") as m:
+                risultato = sql.esegui(testo, sql.LIMITE_PAGINA + 1) # una riga in più per sapere se è stato troncato
+                m["righe"] = risultato.height
+        except pl.exceptions.PolarsError as e:
+            st.error(f"{type(e).__name__}: {e}")
+        else:
+            troncato = risultato.height > sql.LIMITE_PAGINA
+            risultato = risultato.head(sql.LIMITE_PAGINA)
+            st.caption(f"{risultato.height} righe{' (risultato troncato)' if troncato else ''} in {m["ms"]:.0f} ms")
+            st.dataframe(risultato, hide_index = True)
+            with st.expander("Piano di esecuzione"):
+                st.code(sql.piano(testo), language = None)
+
+console()
@@ -0,0 +1,70 @@
+import streamlit as st
+
+import grafici
+import query
+from frammenti import frammento
+from profilo import sezione
+
+with sezione("caricamento/life") as m:
+    m["righe"] = query.df().height
+with sezione("caricamento/cubo"):
+    query.cubo()
+countries = query.countries() # paesi
+
+st.write(f"""#### Trend sull'aspettativa di vita media""")
+### TREND DI CRESCITA TOTALE
+st.markdown(f"""
+            ##### Analisi Totale
+""")
+with sezione("trend_globale/dati") as m:
+    global_trend_data = query.trend_globale()
+    m["righe"] = global_trend_data.height
+
+with sezione("trend_globale/grafico"):
+    st.altair_chart(grafici.trend_globale(global_trend_data), use_container_width = True)
+
+st.markdown('''
+            Questo grafico mostra l'andamento dell'**aspettativa di vita media totale** nel corso degli anni. 
+            E' stata considerata la media dell'aspettativa di vita a livello europeo, considerando tutti i sessi, 
+            con i punti che evidenziano i dati specifici di ogni anno.
+            L'asse X rappresenta gli anni e l'asse Y l'aspettativa di vita media. La linea mostra l'andamento
+            nel tempo e i punti sono le osservazioni.
+
+            Il grafico offre una visione chiara e immediata di come l'aspettativa di vita sia cambiata nel tempo,
+            in particolare in questo caso si osserva un **trend crescente**.
+            E' utile per avere un'idea generale di come fattori globali, quali **miglioramenti della medicina**,
+            **guerre** o **pandemie** abbiamo influenzato sulla vita media della popolazione nel corso del tempo.
+            Per esempio si riesce a vedere l'effetto del covid nel 2020.
+''')
+
+### TREND PER PAESE ED ANNO
+
+st.markdown(f"""
+            ##### Dettagliata per Sesso e Paese
+""")
+@frammento
+def trend_paesi(): # il multiselect riesegue solo questa sezione
+    # multi select per paesi 
+    selected_countries = st.multiselect("Scegli uno o più paesi", countries, default = ["IT", "BE", "CH"], key = "multiselec1") #ita, germ, svizz
+    with sezione("trend/dati") as m:
+        filtered_df = query.trend(tuple(selected_countries))
+        m["righe"] = filtered_df.height
+
+    col1, col2 = st.columns([1, 1])  # divido la pagina in due colonne, per avere i 2 grafici affiancati bene
+
+    with col1:
+        with sezione("trend/grafico"):
+            st.altair_chart(grafici.trend(filtered_df), use_container_width = False)
+
+trend_paesi()
+
+st.markdown(f'''
+            Questo grafico mostra l'**evoluzione dell'aspettativa di vita media nel tempo**, distinguendo maschi
+            e femmine, per i paesi selezionati.
+            L'asse X mostra gli anni, mentre l'asse Y riporta l'aspettativa di vita media.
+            Il grafico a destra mostra le osservazioni delle femmine, mentre quello a sinistra dei maschi,
+            inoltre la linea che mostra l'andamento nel tempo è colorata in base ai paesi, seguendo la leggenda a lato.
+            
+            Dai dati, in generale, risulta ci sia un trend evolutivo positivo, e le donne tendono ad avere un'aspettativa
+            di vita mediamente più alto rispetto agli uomini.
+            ''')
@@ -0,0 +1,41 @@
+import math
+import os
+
+import polars as pl
+
+# riduzione dei dati che ogni grafico altair incorpora nella specifica vega-lite e manda al browser ad ogni rerun.
+# con PAYLOAD_MINIMO=0 si mandano i dataframe così come sono (utile per confrontare)
+ATTIVO = os.environ.get("PAYLOAD_MINIMO", "1") != "0"
+# oltre questo numero di righe i dati vengono aggregati lato server su una griglia più grossa
+MAX_RIGHE = 5_000
+
+def minimizza(df, colonne, chiavi = None, max_righe = MAX_RIGHE, decimali = 2):
+    # colonne: quelle usate dalle codifiche del grafico (x, y, colore, facet, tooltip), le altre non si mandano.
+    # chiavi: colonne che identificano un segno (barra, cella, punto): se indicate si tiene una sola riga per
+    # segno con la media dei valori, come farebbe l'aggregate di vega-lite, ma calcolato qui
+    if not ATTIVO:
+        return df
+    df = df.select(colonne)
+    if chiavi:
+        valori = [c for c in colonne if c not in chiavi]
+        df = df.group_by(chiavi).agg(pl.col(valori).mean())
+        if df.height > max_righe:
+            # troppi segni: la chiave numerica con più modalità (es. gli anni) viene raggruppata in intervalli
+            # larghi quanto basta per stare sotto max_righe
+            numeriche = [c for c in chiavi if df.schema[c].is_integer()]
+            if numeriche:
+                asse = max(numeriche, key = lambda c: df[c].n_unique())
+                passo = math.ceil(df.height / max_righe)
+                df = (
+                    df.with_columns((pl.col(asse) // passo * passo).alias(asse))
+                    .group_by(chiavi)
+                    .agg(pl.col(valori).mean())
+                )
+    tipi = df.schema
+    df = df.with_columns(
+        [pl.col(c).round(decimali) for c in colonne if tipi[c].is_float()] +
+        [pl.col(c).shrink_dtype() for c in colonne if tipi[c].is_integer()] # es. anni in Int16 invece di Int64
+    )
+    # ordine stabile: a parità di dati il payload è identico byte per byte, quindi streamlit gli dà lo stesso
+    # nome (hash) e il browser riusa quello già ricevuto invece di ridisegnare
+    return df.sort(colonne)
@@ -0,0 +1,49 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# misure dei tempi per sezione della dashboard e per fase dei loader.
+# streamlit esegue ogni rerun di una sessione nel suo thread, quindi le misure sono per thread
+_locale = threading.local()
+_scrittura = threading.Lock()
+# file (json, una riga per rerun) dove esportare le misure, se la variabile d'ambiente è impostata
+LOG = os.environ.get("PROFILO_LOG")
+
+def _rss(): # memoria residente del processo in MB, None se non si può leggere (es. su windows)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def inizia(): # da chiamare all'inizio di ogni rerun, azzera le misure del thread
+    _locale.misure = []
+    _locale.livello = 0
+
+def misure():
+    return getattr(_locale, "misure", [])
+
+@contextmanager
+def sezione(nome):
+    # misura tempo, righe prodotte (da impostare con m["righe"] = ...) e variazione di memoria del blocco
+    m = {"sezione": nome, "livello": getattr(_locale, "livello", 0), "righe": None}
+    misure().append(m) # aggiunta subito, così le sezioni annidate restano dopo quella che le contiene
+    _locale.livello = m["livello"] + 1
+    rss = _rss()
+    inizio = time.perf_counter()
+    try:
+        yield m
+    finally:
+        m["ms"] = round((time.perf_counter() - inizio) * 1000, 2)
+        m["mem_mb"] = None if rss is None else round(_rss() - rss, 2)
+        _locale.livello = m["livello"]
+
+def esporta(**extra): # aggiunge le misure del rerun al file di log, con eventuali campi extra
+    if not LOG or not misure():
+        return
+    riga = {"quando": datetime.now(timezone.utc).isoformat(timespec = "milliseconds"), **extra, "sezioni": misure()}
+    with _scrittura, open(LOG, "a") as f:
+        f.write(json.dumps(riga) + "\n")
@@ -0,0 +1,253 @@
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from pathlib import Path
+
+import polars as pl
+
+import aggregazioni as agg
+import correlazioni as corr
+import profilo
+from cubo import costruisci, da_pila, impila, posizioni
+from data import derivato_life, scan_life, scan_work
+
+# interrogazioni sui dati della dashboard, utilizzabili anche senza streamlit (es. da server.py o da un notebook).
+# dati di base e risultati stanno in cache nel processo: chi chiede gli stessi numeri (sessioni della dashboard,
+# richieste http) li riceve dalla memoria, senza ricalcolarli. I frame restituiti sono gli stessi oggetti per tutte le
+# sessioni del processo (una sola copia in memoria, qualunque sia il numero di utenti): vanno trattati in sola
+# lettura, per modificarli si crea un nuovo frame (with_columns, filter, ...), mai sul posto
+
+LIFE = str(Path(__file__).parent / "estat_demo_mlexpec.tsv.gz")
+WORK = str(Path(__file__).parent / "estat_ilc_iw01.tsv.gz")
+# numero massimo di risultati tenuti in memoria per ogni aggregazione (uno per anno/paese chiesto),
+# oltre questo limite si scartano quelli usati meno di recente
+MAX_CACHE = 64
+
+def _una_volta(fn):
+    # come lru_cache(maxsize = 1) per le funzioni senza argomenti, ma se due thread la chiamano insieme
+    # (es. il preriscaldamento e la prima sessione) il secondo aspetta il risultato del primo invece di ricalcolarlo
+    lock = threading.Lock()
+    risultato = []
+    @wraps(fn)
+    def f():
+        if not risultato:
+            with lock:
+                if not risultato:
+                    risultato.append(fn())
+        return risultato[0]
+    f.in_memoria = lambda: bool(risultato) # True se già calcolata, senza calcolarla
+    return f
+
+### DATI DI BASE, una volta per processo
+
+@_una_volta
+def df(): # dataset con sola fascia <=1 anno, il filtro viene applicato già in lettura
+    return scan_life(url = LIFE, filtri = pl.col("age") == 1).collect()
+
+@_una_volta
+def cubo():
+    # cubo delle medie su (country, year, sex, age), calcolato una volta e salvato in cache con i dati puliti:
+    # gli altri processi (e i riavvii) lo rileggono invece di ricalcolarlo, con CACHE_IPC senza copiarlo in memoria
+    return da_pila(derivato_life(LIFE, "cubo", lambda lf: impila(costruisci(lf))))
+
+@_una_volta
+def paesi_iso3():
+    return agg.paesi_iso3(df())
+
+@_una_volta
+def countries(): # paesi
+    return df().select("country").unique().sort("country")
+
+@_una_volta
+def years(): # anni
+    return df().select("year").unique().sort("year")
+
+@_una_volta
+def df_join(): # medie per paese e anno di aspettativa di vita e tasso di povertà dei lavoratori
+    df_work = scan_work(url = WORK, colonne = ["country", "year", "poverty_rate"]).collect()
+    return agg.join(cubo(), df_work).sort("country", "year") # righe di ogni paese contigue, vedi join_paese
+
+@_una_volta
+def countries_join(): # paesi presenti in entrambi i dataset
+    return df_join().select("country").unique().sort("country")
+
+@_una_volta
+def _posizioni_join(): # (inizio, lunghezza) delle righe di ogni paese in df_join
+    return posizioni(df_join(), ["country"])
+
+def join_paese(country): # slice delle righe del paese, senza filtrare tutto df_join
+    return df_join().slice(*_posizioni_join().get((country,), (0, 0)))
+
+### AGGREGAZIONI, con chiave i parametri (le liste di paesi vanno passate come tuple)
+
+@lru_cache(maxsize = MAX_CACHE)
+def bar_chart(year):
+    return agg.bar_chart(cubo(), year)
+
+@lru_cache(maxsize = MAX_CACHE)
+def sex(year, countries):
+    return agg.sex(cubo(), year, countries)
+
+# tutti gli anni insieme, per i grafici con l'anno scelto nel browser: un solo payload, nessun rerun per anno
+@_una_volta
+def bar_chart_anni():
+    return agg.bar_chart(cubo()).sort("year", "country")
+
+@lru_cache(maxsize = MAX_CACHE)
+def sex_anni(countries):
+    return agg.sex(cubo(), None, countries).sort("year", "country", "sex")
+
+@_una_volta
+def anomalie_anni():
+    return agg.anomalie(cubo())
+
+@lru_cache(maxsize = MAX_CACHE)
+def mappa(year):
+    return agg.mappa(cubo(), paesi_iso3(), year)
+
+@lru_cache(maxsize = MAX_CACHE)
+def gap_mappa(year):
+    return agg.gap_mappa(cubo(), paesi_iso3(), year)
+
+@_una_volta
+def mappa_anni(): # tutti gli anni insieme, per la mappa animata
+    return agg.mappa(cubo(), paesi_iso3()).sort("year", "country_iso3")
+
+@_una_volta
+def gap_mappa_anni():
+    return agg.gap_mappa(cubo(), paesi_iso3()).sort("year", "country_iso3")
+
+@_una_volta
+def trend_globale():
+    return agg.trend_globale(cubo())
+
+@lru_cache(maxsize = MAX_CACHE)
+def trend(countries):
+    return agg.trend(cubo(), countries)
+
+@lru_cache(maxsize = MAX_CACHE)
+def anomalie(year):
+    return agg.anomalie(cubo(), year)
+
+@_una_volta
+def percentili():
+    # percentili della heatmap di tutti i paesi, calcolati una volta e salvati in cache con i dati puliti,
+    # ordinati per paese, con la posizione (inizio, lunghezza) delle righe di ogni paese
+    df = derivato_life(LIFE, "percentili", agg.percentili)
+    return df, posizioni(df, ["country"])
+
+def heatmap(country): # slice delle righe del paese, senza copie né calcoli
+    df, pos = percentili()
+    return df.slice(*pos.get((country,), (0, 0)))
+
+@lru_cache(maxsize = MAX_CACHE)
+def correlazione(country): # valore letto dalla correlazione di tutti i paesi, già calcolata
+    return agg.correlazione(join_paese(country), country, correlazioni_paesi())
+
+@_una_volta
+def correlazioni_paesi(): # correlazione e anni in comune di ogni paese, senza intervalli né ritardi
+    return corr.tutte(df_join())
+
+@_una_volta
+def correlazioni(): # tutti i paesi: correlazione, intervallo di confidenza bootstrap e ritardo più forte
+    return corr.tabella(df_join())
+
+@lru_cache(maxsize = MAX_CACHE)
+def correlazioni_mobili(finestra):
+    return corr.mobili(df_join(), finestra)
+
+def correlazione_mobile(finestra, country):
+    # mobili ha le stesse righe di df_join, nello stesso ordine (paese, anno): valgono le sue posizioni
+    return correlazioni_mobili(finestra).slice(*_posizioni_join().get((country,), (0, 0)))
+
+@_una_volta
+def correlazioni_ritardate():
+    return corr.ritardate(df_join())
+
+### MEMORIA
+
+def _mb(*frames):
+    return round(sum(f.estimated_size("mb") for f in frames), 2)
+
+def memoria():
+    # MB dei frame condivisi già caricati nel processo: non dipendono dal numero di sessioni aperte
+    condivisi = {
+        "df": lambda: [df()],
+        "cubo": lambda: cubo()["rollup"].values(), # gli indici sono solo posizioni, nessuna copia dei rollup
+        "df_join": lambda: [df_join()],
+        "percentili": lambda: [percentili()[0]],
+    }
+    return {nome: _mb(*frames()) for nome, frames in condivisi.items() if globals()[nome].in_memoria()}
+
+### PRERISCALDAMENTO
+
+_pronto = threading.Event()
+_avvio = threading.Lock()
+_pool = []
+_falliti = [] # nomi dei compiti del preriscaldamento finiti con un errore
+_misure = [] # misure (profilo) dei compiti del preriscaldamento, eseguiti nei thread del pool
+_log = logging.getLogger(__name__)
+
+def _compito(f):
+    # le misure di profilo sono per thread: quelle del compito (con i loader e il parsing che esegue) si raccolgono
+    # qui, per il pannello di debug e per il file di PROFILO_LOG
+    profilo.inizia()
+    try:
+        with profilo.sezione(f"preriscalda/{f.__name__}"):
+            return f()
+    finally:
+        _misure.extend(profilo.misure())
+        profilo.esporta(preriscaldamento = f.__name__)
+
+def preriscalda(workers = min(4, os.cpu_count() or 1)):
+    # carica in background, in parallelo, i due dataset e le aggregazioni che non dipendono da scelte dell'utente,
+    # così non li paga la prima sessione dopo un riavvio. Solo la prima chiamata del processo fa qualcosa.
+    # polars rilascia il gil durante i calcoli, quindi life e work vengono davvero letti insieme
+    with _avvio:
+        if _pool:
+            return
+        _pool.append(ThreadPoolExecutor(workers, thread_name_prefix = "preriscalda"))
+    # prima i dati di base (life, cubo e work partono subito), poi i derivati, che aspettano quelli che gli servono
+    compiti = [df, cubo, df_join, paesi_iso3, countries, years, countries_join,
+               mappa_anni, gap_mappa_anni, trend_globale, percentili, correlazioni_paesi, correlazioni]
+    futuri = {_pool[0].submit(_compito, f): f.__name__ for f in compiti}
+    finiti = [] # callback eseguite: pronto solo dopo che tutti gli errori sono stati registrati
+    def finito(futuro):
+        # l'errore di un compito non lo legge nessun altro: si registra qui. La prima sessione che chiede lo stesso
+        # dato lo ricalcola e vede l'errore nella pagina
+        if (errore := futuro.exception()) is not None:
+            _log.error("preriscaldamento: %s non riuscito", futuri[futuro], exc_info = errore)
+            _falliti.append(futuri[futuro])
+        with _avvio:
+            finiti.append(futuro)
+            if len(finiti) == len(futuri):
+                _pronto.set()
+    for f in futuri:
+        f.add_done_callback(finito)
+
+def pronto(): # True quando il preriscaldamento è finito (anche se qualche compito è fallito, vedi falliti())
+    return _pronto.is_set()
+
+def falliti(): # compiti del preriscaldamento finiti con un errore
+    return list(_falliti)
+
+def attendi(timeout = None): # aspetta la fine del preriscaldamento, False se scade il timeout
+    return _pronto.wait(timeout)
+
+def misure_preriscaldamento(): # misure dei compiti finiti, nell'ordine in cui sono finiti
+    return list(_misure)
+
+if __name__ == "__main__":
+    # preriscaldamento prima di avviare i server (es. come passo del deploy): scrive in .cache i dataset puliti e
+    # le tabelle derivate, così il primo processo streamlit li rilegge invece di analizzare i tsv
+    logging.basicConfig(level = logging.INFO)
+    preriscalda()
+    attendi()
+    for m in misure_preriscaldamento():
+        if m["livello"] == 0:
+            print(f"{m['sezione']}: {m['ms']:.0f} ms")
+    if falliti():
+        sys.exit(f"preriscaldamento non riuscito: {', '.join(falliti())}")
@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import polars as pl
+
+import grafici
+import query
+
+# genera senza streamlit tutti i grafici della dashboard, per ogni anno e paese, in html/json/png.
+# usa le stesse aggregazioni (query.py) e gli stessi grafici (grafici.py) della dashboard. I grafici vengono divisi
+# tra più processi; un grafico viene riscritto solo se sono cambiati i suoi dati o il codice dei grafici, confrontando
+# un'impronta con quella salvata in indice.json dall'esecuzione precedente
+
+CARTELLA = Path(__file__).parent / "report"
+FORMATI = ["html", "json"]
+INDICE = "indice.json"
+
+# sezione -> (parametro, dati del grafico, grafico). Parametro: "anno" un grafico per anno, "paese" uno per paese,
+# "paese_join" uno per paese presente in entrambi i dataset, None un solo grafico
+SEZIONI = {
+    "barre": ("anno", lambda anno, paese: (query.bar_chart(anno),), grafici.barre),
+    "sessi": ("anno", lambda anno, paese: (query.sex(anno, tuple(query.countries()["country"])),), grafici.sessi),
+    "anomalie": ("anno", lambda anno, paese: (query.anomalie(anno),), grafici.anomalie),
+    "mappa": (None, lambda anno, paese: (query.mappa_anni(), "asp. di vita media"), grafici.mappa),
+    "gap_mappa": (None, lambda anno, paese: (query.gap_mappa_anni(), "Deviazione"), grafici.mappa),
+    "trend_globale": (None, lambda anno, paese: (query.trend_globale(),), grafici.trend_globale),
+    "trend": ("paese", lambda anno, paese: (query.trend((paese,)),), grafici.trend),
+    "heatmap": ("paese", lambda anno, paese: (query.heatmap(paese),), grafici.heatmap),
+    "correlazione": ("paese_join", lambda anno, paese: query.correlazione(paese)[:2], grafici.correlazione),
+    "correlazione_mobile": ("paese_join", lambda anno, paese: (
+        query.correlazioni_mobili(5).filter(pl.col("country") == paese),), grafici.correlazione_mobile),
+}
+
+def _codice(): # impronta del codice che costruisce i grafici: se cambia, vanno rigenerati tutti
+    h = hashlib.sha256()
+    for nome in ["grafici.py", "payload.py"]:
+        h.update((Path(__file__).parent / nome).read_bytes())
+    return h.hexdigest()
+
+def _impronta(argomenti, codice, formati):
+    h = hashlib.sha256(f"{codice}|{','.join(formati)}".encode())
+    for a in argomenti:
+        if isinstance(a, pl.DataFrame):
+            # l'ordine delle righe dei group_by e le ultime cifre delle somme cambiano da un'esecuzione all'altra:
+            # si confrontano righe ordinate e valori arrotondati, come arrivano al grafico
+            a = a.with_columns(pl.col(pl.Float32, pl.Float64).round(4)).sort(a.columns)
+            h.update(a.write_csv().encode())
+        else:
+            h.update(repr(a).encode())
+    return h.hexdigest()
+
+def _nome(sezione, anno, paese): # es. barre/2003, heatmap/IT, mappa/mappa
+    return f"{sezione}/{anno if anno is not None else paese if paese is not None else sezione}"
+
+def compiti(sezioni):
+    valori = {
+        "anno": lambda: [(a, None) for a in query.years()["year"]],
+        "paese": lambda: [(None, p) for p in query.countries()["country"]],
+        "paese_join": lambda: [(None, p) for p in query.countries_join()["country"]],
+        None: lambda: [(None, None)],
+    }
+    return [(s, anno, paese) for s in sezioni for anno, paese in valori[SEZIONI[s][0]]()]
+
+def _salva(grafico, path, formato):
+    if hasattr(grafico, "write_html"): # figura plotly (mappe)
+        if formato == "html":
+            grafico.write_html(path, include_plotlyjs = "cdn")
+        elif formato == "json":
+            path.write_text(grafico.to_json())
+        else:
+            grafico.write_image(path) # serve kaleido
+    else: # grafico altair, per png serve vl-convert
+        grafico.save(path)
+
+def _genera(lavoro):
+    # un grafico: ritorna (nome, impronta, True se riscritto). I dati si calcolano sempre (dalla cache del processo),
+    # il grafico si costruisce e si scrive solo se l'impronta è diversa da quella precedente o manca un file
+    (sezione, anno, paese), cartella, formati, codice, precedente = lavoro
+    _, dati, grafico = SEZIONI[sezione]
+    argomenti = dati(anno, paese)
+    nome = _nome(sezione, anno, paese)
+    impronta = _impronta(argomenti, codice, formati)
+    paths = [cartella / f"{nome}.{formato}" for formato in formati]
+    if impronta == precedente and all(p.exists() for p in paths):
+        return nome, impronta, False
+    paths[0].parent.mkdir(parents = True, exist_ok = True)
+    figura = grafico(*argomenti)
+    for path, formato in zip(paths, formati):
+        _salva(figura, path, formato)
+    return nome, impronta, True
+
+def genera(sezioni = None, cartella = CARTELLA, formati = FORMATI, workers = os.cpu_count() or 1, forza = False):
+    cartella = Path(cartella)
+    indice_path = cartella / INDICE
+    indice = json.loads(indice_path.read_text()) if indice_path.exists() else {}
+    codice = _codice()
+    # con forza si ignorano le impronte precedenti, ma l'indice tiene quelle delle sezioni non rigenerate
+    lavori = [(c, cartella, formati, codice, None if forza else indice.get(_nome(*c)))
+              for c in compiti(sezioni or list(SEZIONI))]
+    scritti = 0
+    try:
+        if workers > 1:
+            # spawn e non fork: polars usa già più thread, e un fork di un processo con thread può bloccarsi.
+            # ogni processo carica i dati dalla cache parquet e li tiene per tutti i grafici che gli toccano
+            with ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context("spawn")) as pool:
+                risultati = pool.map(_genera, lavori, chunksize = max(1, len(lavori) // (workers * 4)))
+                for nome, impronta, scritto in risultati:
+                    indice[nome] = impronta
+                    scritti += scritto
+        else:
+            for lavoro in lavori:
+                nome, impronta, scritto = _genera(lavoro)
+                indice[nome] = impronta
+                scritti += scritto
+    finally: # anche se interrotto, i grafici già scritti non vengono rigenerati alla prossima esecuzione
+        cartella.mkdir(parents = True, exist_ok = True)
+        tmp = indice_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(indice, indent = 0, sort_keys = True))
+        tmp.replace(indice_path)
+    return len(lavori), scritti
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Genera i grafici della dashboard per ogni anno e paese")
+    parser.add_argument("--sezioni", nargs = "+", choices = list(SEZIONI), help = "solo queste sezioni (default tutte)")
+    parser.add_argument("--formati", nargs = "+", choices = ["html", "json", "png"], default = FORMATI,
+                        help = "png richiede vl-convert-python (altair) e kaleido (plotly)")
+    parser.add_argument("--cartella", default = CARTELLA)
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1, help = "processi in parallelo")
+    parser.add_argument("--forza", action = "store_true", help = "rigenera tutto, anche i grafici non cambiati")
+    args = parser.parse_args()
+    if "png" in args.formati:
+        mancanti = [m for m in ["vl_convert", "kaleido"] if importlib.util.find_spec(m) is None]
+        if mancanti:
+            sys.exit(f"per il formato png servono i pacchetti: {', '.join(mancanti)}")
+    inizio = time.perf_counter()
+    totale, scritti = genera(args.sezioni, args.cartella, args.formati, args.workers, args.forza)
+    print(f"{totale} grafici, {scritti} generati, {totale - scritti} invariati, "
+          f"in {time.perf_counter() - inizio:.1f} s ({args.workers} processi)")
@@ -0,0 +1,115 @@
+import argparse
+import json
+import math
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import polars as pl
+
+import query
+
+# endpoint http/json locale con gli stessi numeri della dashboard, senza eseguire lo script streamlit.
+# uso: python server.py --porta 8600, poi es. GET /bar_chart?year=2003 o /sex?year=2003&countries=IT,BE
+
+def _anno(p):
+    return int(p["year"])
+
+class NonTrovato(Exception): # risposta 404, es. paese che non è nei dati
+    pass
+
+def _noti(paesi, validi = None):
+    # paesi che non sono nei dati -> 404, invece di una risposta vuota che sembra un risultato.
+    # validi: paesi ammessi, di default tutti quelli del dataset sull'aspettativa di vita
+    validi = query.countries() if validi is None else validi
+    sconosciuti = [c for c in paesi if c not in validi["country"]]
+    if sconosciuti:
+        raise NonTrovato(f"paese sconosciuto: {', '.join(sconosciuti)}")
+    return paesi
+
+def _paese(p):
+    return _noti([p["country"]])[0]
+
+def _paesi(p): # lista di paesi separati da virgola -> tupla (chiave della cache)
+    paesi = tuple(c for c in p["countries"].split(",") if c)
+    if not paesi:
+        raise ValueError("lista vuota: countries deve contenere almeno un paese")
+    return _noti(paesi)
+
+def _correlazione(country):
+    _noti([country], query.countries_join()) # la correlazione c'è solo per i paesi di entrambi i dataset
+    _, df_filtered_join, valore = query.correlazione(country)
+    return {"country": country, "correlation": valore, "data": df_filtered_join.to_dicts()}
+
+def _senza_nan(oggetto):
+    # NaN (es. correlazione di una serie costante) -> null: json.dumps scriverebbe NaN, che non è json valido
+    if isinstance(oggetto, float) and math.isnan(oggetto):
+        return None
+    if isinstance(oggetto, dict):
+        return {k: _senza_nan(v) for k, v in oggetto.items()}
+    if isinstance(oggetto, list):
+        return [_senza_nan(v) for v in oggetto]
+    return oggetto
+
+# percorso -> funzione dei parametri della richiesta
+ROTTE = {
+    "/countries": lambda p: query.countries(),
+    "/years": lambda p: query.years(),
+    "/bar_chart": lambda p: query.bar_chart(_anno(p)), # media per paese
+    "/sex": lambda p: query.sex(_anno(p), _paesi(p)), # media per paese e sesso
+    "/mappa": lambda p: query.mappa(_anno(p)), # media per paese (iso3)
+    "/gap_mappa": lambda p: query.gap_mappa(_anno(p)), # differenza femmine - maschi per paese (iso3)
+    "/trend_globale": lambda p: query.trend_globale(),
+    "/trend": lambda p: query.trend(_paesi(p)),
+    "/anomalie": lambda p: query.anomalie(_anno(p)), # deviazione dalla media europea, 5 più alte e 5 più basse
+    "/heatmap": lambda p: query.heatmap(_paese(p)),
+    "/correlazione": lambda p: _correlazione(p["country"]),
+    "/correlazioni": lambda p: query.correlazioni(), # tutti i paesi, con intervallo di confidenza e ritardo
+    "/correlazioni_mobili": lambda p: query.correlazioni_mobili(int(p.get("finestra", 5))),
+    "/correlazioni_ritardate": lambda p: query.correlazioni_ritardate(),
+}
+
+@lru_cache(maxsize = 256)
+def risposta(percorso, parametri):
+    # corpo json già serializzato: una richiesta ripetuta non rifà nemmeno la conversione in json
+    risultato = ROTTE[percorso](dict(parametri))
+    if isinstance(risultato, pl.DataFrame):
+        return risultato.write_json().encode() # polars scrive già i NaN come null
+    return json.dumps(_senza_nan(risultato), allow_nan = False).encode()
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path not in ROTTE:
+            return self._invia(404, {"errore": "percorso sconosciuto", "percorsi": sorted(ROTTE)})
+        try:
+            # con i valori vuoti: countries= è una lista vuota (400), non un parametro mancante
+            corpo = risposta(url.path, tuple(sorted(parse_qsl(url.query, keep_blank_values = True))))
+        except NonTrovato as e:
+            return self._invia(404, {"errore": str(e)})
+        except KeyError as e:
+            return self._invia(400, {"errore": f"parametro mancante: {e.args[0]}"})
+        except (ValueError, OverflowError) as e: # es. anno non numerico, finestra troppo corta o fuori scala
+            return self._invia(400, {"errore": str(e)})
+        self._invia(200, corpo)
+
+    def _invia(self, stato, corpo):
+        if not isinstance(corpo, bytes):
+            corpo = json.dumps(corpo, allow_nan = False).encode()
+        self.send_response(stato)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "API json con le aggregazioni della dashboard")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--porta", type = int, default = 8600)
+    args = parser.parse_args()
+    query.preriscalda()
+    query.attendi() # dati e aggregazioni comuni caricati prima di accettare richieste
+    if query.falliti(): # l'errore è già nel log: le richieste che ne dipendono lo ricalcolano e rispondono con l'errore
+        print(f"preriscaldamento non riuscito: {', '.join(query.falliti())}")
+    print(f"in ascolto su http://{args.host}:{args.porta}")
+    ThreadingHTTPServer((args.host, args.porta), Handler).serve_forever()
@@ -0,0 +1,84 @@
+import argparse
+import os
+import re
+import sys
+
+import polars as pl
+
+import query
+from data import scan_life, scan_work
+
+# console sql sui dataset puliti, per le analisi che la dashboard non offre (fasce d'età, wstatus, intervalli di anni...).
+# le tabelle sono scan lazy dei parquet in cache, con i codici (paesi, fasce d'età...) come testo: filtri e colonne
+# della query vengono spinti nella lettura, niente parsing dei tsv. Uso: python sql.py "SELECT ..." oppure dalla pagina "Console SQL" della dashboard
+
+ESEMPIO = """SELECT country, wstatus, ROUND(AVG(poverty_rate), 2) AS poverty_rate
+FROM work
+WHERE year BETWEEN 2015 AND 2020 AND sex = 'T' AND age = 'Y_GE18'
+GROUP BY country, wstatus
+ORDER BY country, wstatus"""
+
+# la pagina "Console SQL" della dashboard è disattivata di default: chiunque apra la dashboard potrebbe eseguire
+# query sul processo condiviso da tutte le sessioni. Si attiva con CONSOLE_SQL=1
+CONSOLE = os.environ.get("CONSOLE_SQL", "0") == "1"
+# righe massime del risultato mostrato nella pagina
+LIMITE_PAGINA = 10_000
+# funzioni tabella di polars sql che leggono file dal disco (es. read_csv('/etc/passwd')): non ammesse, le query
+# vedono solo le tabelle del contesto. Si rifiuta ogni parola che inizia per read_, anche tra virgolette o
+# seguita da un commento prima della parentesi
+_LETTURE = re.compile(r"\bread_\w*", re.IGNORECASE)
+
+def contesto():
+    return pl.SQLContext({
+        "life": scan_life(query.LIFE, codici = False), # sex, age, country, year, life_exp (tutte le età)
+        "work": scan_work(query.WORK, codici = False), # wstatus, sex, age (fasce), year, poverty_rate, country
+    })
+
+def tabelle(): # nome tabella -> schema
+    ctx = contesto()
+    return {nome: ctx.execute(f"SELECT * FROM {nome}").collect_schema() for nome in ctx.tables()}
+
+def _controlla(testo): # solo le tabelle del contesto, niente letture di file
+    if (funzione := _LETTURE.search(testo)):
+        raise pl.exceptions.SQLInterfaceError(
+            f"funzione non ammessa: {funzione.group()} (tabelle disponibili: {', '.join(contesto().tables())})")
+
+def piano(testo): # piano ottimizzato, per controllare quali filtri e colonne arrivano alla lettura
+    _controlla(testo)
+    return contesto().execute(testo).explain()
+
+def esegui(testo, limite = None):
+    # gli errori di sintassi o di colonne inesistenti, e le funzioni non ammesse, arrivano come pl.exceptions.PolarsError
+    _controlla(testo)
+    lf = contesto().execute(testo)
+    if limite is not None:
+        lf = lf.limit(limite)
+    return lf.collect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Query sql sui dataset puliti (tabelle: life, work)")
+    parser.add_argument("query", nargs = "?", help = "testo della query, se manca si legge da stdin (o si usa l'esempio)")
+    parser.add_argument("--piano", action = "store_true", help = "mostra il piano di esecuzione invece del risultato")
+    parser.add_argument("--formato", choices = ["tabella", "csv", "json"], default = "tabella")
+    parser.add_argument("--limite", type = int, help = "numero massimo di righe")
+    parser.add_argument("--tabelle", action = "store_true", help = "mostra tabelle e colonne disponibili")
+    args = parser.parse_args()
+    if args.tabelle:
+        for nome, schema in tabelle().items():
+            print(nome + ": " + ", ".join(f"{c} ({t})" for c, t in schema.items()))
+        sys.exit()
+    testo = args.query or (ESEMPIO if sys.stdin.isatty() else sys.stdin.read())
+    try:
+        if args.piano:
+            print(piano(testo))
+            sys.exit()
+        risultato = esegui(testo, args.limite)
+    except pl.exceptions.PolarsError as e:
+        sys.exit(f"errore ({type(e).__name__}): {e}")
+    if args.formato == "csv":
+        print(risultato.write_csv(), end = "")
+    elif args.formato == "json":
+        print(risultato.write_json())
+    else:
+        with pl.Config(tbl_rows = -1, tbl_cols = -1):
+            print(risultato)
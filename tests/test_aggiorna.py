@@ -0,0 +1,81 @@
+import gzip
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import data
+
+# aggiornamento incrementale della cache (data.aggiorna_life/aggiorna_work): dopo ogni aggiornamento il dataset in
+# cache deve essere uguale al parsing completo del nuovo sorgente.
+# uso: python -m unittest discover tests (dalla cartella del progetto)
+
+CARTELLA = Path(__file__).parent.parent
+DATASET = [("work", "estat_ilc_iw01.tsv.gz", data.work, data.aggiorna_work),
+           ("life", "estat_demo_mlexpec.tsv.gz", data.life, data.aggiorna_life)]
+
+def _cella(righe, i, colonna, valore): # righe del tsv con la cella (i, colonna) sostituita
+    campi = righe[i].rstrip("\n").split("\t")
+    campi[colonna] = valore
+    return righe[:i] + ["\t".join(campi) + "\n"] + righe[i + 1:]
+
+class TestAggiorna(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.cache_dir, self.parti_max = data.CACHE_DIR, data.PARTI_MAX
+        data.CACHE_DIR = self.tmp / "cache"
+
+    def tearDown(self):
+        data.CACHE_DIR, data.PARTI_MAX = self.cache_dir, self.parti_max
+        shutil.rmtree(self.tmp)
+
+    def scrivi(self, righe, nome):
+        path = self.tmp / nome
+        with gzip.open(path, "wt") as f:
+            f.write("".join(righe))
+        return str(path)
+
+    def controlla(self, nome, url, carica, aggiorna, caso):
+        # dataset in cache (tutte le parti) uguale al parsing completo, a meno dell'ordine delle righe;
+        # ritorna i file che compongono la cache
+        aggiorna(url)
+        dalla_cache, completo = data._testo(carica(url)), data._testo(carica(url, cache = False))
+        self.assertEqual(dalla_cache.columns, completo.columns, caso)
+        self.assertTrue(dalla_cache.sort(completo.columns).equals(completo.sort(completo.columns)), caso)
+        return data._parti(data._cache_path(url, nome))
+
+    def test_aggiornamenti(self):
+        for nome, sorgente, carica, aggiorna in DATASET:
+            with self.subTest(nome):
+                righe = gzip.open(CARTELLA / sorgente, "rt").readlines()
+                # cache di partenza: senza l'ultimo anno e senza le ultime 3 righe
+                senza_anno = ["\t".join(r.rstrip("\n").split("\t")[:-1]) + "\n" for r in righe]
+                carica(self.scrivi(senza_anno[:-3], "v0.tsv.gz"))
+
+                # anno nuovo e righe nuove: un file in più, i precedenti restano
+                parti = self.controlla(nome, self.scrivi(righe, "v1.tsv.gz"), carica, aggiorna, "anno e righe nuove")
+                self.assertEqual(len(parti), 2)
+
+                # cella revisionata e riga tolta: il dataset si riscrive in un solo file
+                nuove = _cella(righe, 10, 5, "99.9")
+                del nuove[20]
+                parti = self.controlla(nome, self.scrivi(nuove, "v2.tsv.gz"), carica, aggiorna, "revisione e riga tolta")
+                self.assertEqual(len(parti), 1)
+
+                # valore revisionato a null (":"), stesse colonne
+                nuove = _cella(nuove, 30, 3, ":")
+                self.controlla(nome, self.scrivi(nuove, "v3.tsv.gz"), carica, aggiorna, "revisione a null")
+                shutil.rmtree(data.CACHE_DIR)
+
+    def test_parti_max(self):
+        # oltre PARTI_MAX file il dataset si riscrive in uno solo
+        data.PARTI_MAX = 2
+        nome, sorgente, carica, aggiorna = DATASET[0]
+        righe = gzip.open(CARTELLA / sorgente, "rt").readlines()
+        carica(self.scrivi(righe[:-3], "v0.tsv.gz"))
+        parti = [len(self.controlla(nome, self.scrivi(righe[:len(righe) - k], f"v{k}.tsv.gz"), carica, aggiorna, f"-{k}"))
+                 for k in (2, 1, 0)]
+        self.assertEqual(parti, [2, 1, 2])
+
+if __name__ == "__main__":
+    unittest.main()